@@ -1,7 +1,11 @@
 import numpy as np
-import matplotlib.pyplot as plt
 from scipy.signal import hilbert, find_peaks
+from scipy.fft import next_fast_len
 from scipy.interpolate import interp1d
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+
+from plot_downsampler import PlotDownsampler
+from figure_renderer import FigureRenderer
 
 
 class AmplitudeAnalyzer:
@@ -29,14 +33,86 @@ class AmplitudeAnalyzer:
         self.envelope_hilbert = None
         self.envelope_interp = None
         self.envelope_minmax = None
+        self.beat_amplitudes = None
 
-    def compute_hilbert_envelope(self):
+    def compute_hilbert_envelope(self, block_size=None, overlap=16384):
         """
         Calcule l’enveloppe via transformée de Hilbert (amplitude instantanée).
+
+        Par défaut la transformée porte sur tout le signal en une fois. Avec block_size,
+        le calcul est fait par blocs recouvrants (voir iter_hilbert_envelope) : la mémoire
+        de travail est bornée par la taille des blocs.
+
+        Args:
+            block_size (int|None) : Taille des blocs en échantillons (None = calcul en une fois)
+            overlap (int)         : Contexte ajouté de chaque côté d’un bloc (en échantillons)
+
+        Returns:
+            np.ndarray : enveloppe de Hilbert
+        """
+        if block_size is None:
+            analytic_signal = hilbert(self.signal)
+            self.envelope_hilbert = np.abs(analytic_signal)
+            return self.envelope_hilbert
+
+        envelope = np.empty(len(self.signal))
+        chunks = (self.signal[i:i + block_size]
+                  for i in range(0, len(self.signal), block_size))
+        pos = 0
+        for block in self.iter_hilbert_envelope(chunks, block_size, overlap):
+            envelope[pos:pos + len(block)] = block
+            pos += len(block)
+
+        self.envelope_hilbert = envelope
+        return envelope
+
+    def iter_hilbert_envelope(self, chunks, block_size=65536, overlap=16384):
+        """
+        Enveloppe de Hilbert par blocs recouvrants (overlap-save), sur une source de morceaux.
+
+        Chaque bloc de block_size échantillons est transformé avec `overlap` échantillons
+        de contexte de chaque côté, sur une longueur FFT rapide (next_fast_len), et seul
+        le centre est conservé. La moyenne locale est retirée avant la transformée
+        (la transformée de Hilbert d’une constante est nulle).
+
+        Tolérance : hors des `overlap` premiers et derniers échantillons, pour un signal
+        sans dérive lente (ex. signal moins sa tendance TrendExtractor), l’écart au calcul
+        en une fois reste inférieur à 1e-3 × max de l’enveloppe avec overlap=16384
+        (≈ 1e-4 mesuré sur data1 à 200 Hz, ≈ 2e-3 avec overlap=4096). Les composantes plus
+        lentes que la fenêtre ne sont pas reproduites : sur un signal brut à forte dérive,
+        la transformée globale dépend de tout l’enregistrement et l’écart peut atteindre
+        quelques % de l’enveloppe.
+
+        Args:
+            chunks (iterable)  : Morceaux successifs du signal (np.ndarray 1-D, tailles libres)
+            block_size (int)   : Nombre d’échantillons d’enveloppe produits par bloc
+            overlap (int)      : Contexte de chaque côté d’un bloc (latence = overlap échantillons)
+
+        Yields:
+            np.ndarray : enveloppe des blocs successifs (block_size échantillons, sauf le dernier)
         """
-        analytic_signal = hilbert(self.signal)
-        self.envelope_hilbert = np.abs(analytic_signal)
-        return self.envelope_hilbert
+        def envelope_of(segment):
+            n_fft = next_fast_len(len(segment))
+            quadrature = np.imag(
+                hilbert(segment - segment.mean(), N=n_fft))[:len(segment)]
+            return np.hypot(segment, quadrature)
+
+        buffer = np.empty(0)
+        context = 0  # Nombre d’échantillons déjà émis gardés comme contexte gauche
+
+        for chunk in chunks:
+            buffer = np.concatenate((buffer, np.asarray(chunk, dtype=np.float64)))
+
+            while len(buffer) - context >= block_size + overlap:
+                segment = buffer[:context + block_size + overlap]
+                yield envelope_of(segment)[context:context + block_size]
+
+                new_context = min(overlap, context + block_size)
+                buffer = buffer[context + block_size - new_context:]
+                context = new_context
+
+        if len(buffer) > context:
+            yield envelope_of(buffer)[context:]
 
     def compute_interpolated_envelope(self, distance=20, prominence=0.1):
         """
@@ -74,30 +150,104 @@ class AmplitudeAnalyzer:
         self.envelope_interp = (upper, lower)
         return upper, lower
 
-    def compute_minmax_envelope(self, window_size=200):
+    def compute_minmax_envelope(self, window_size=200, signal=None):
         """
         Enveloppe locale par fenêtre glissante (min et max locaux).
 
+        La fenêtre du point i couvre [i - window_size//2, i + window_size//2[, tronquée
+        aux bords du signal. Le calcul utilise des filtres min/max glissants en O(n),
+        indépendamment de window_size.
+
         Args:
-            window_size (int) : Taille de la fenêtre (en nb d’échantillons)
+            window_size (int)      : Taille de la fenêtre (en nb d’échantillons)
+            signal (np.ndarray)    : Signal(s) à traiter (par défaut self.signal) ;
+                                     un tableau 2-D est traité ligne par ligne
 
         Returns:
             Tuple[np.ndarray, np.ndarray] : enveloppe supérieure et inférieure
         """
-        n = len(self.signal)
-        upper = np.zeros(n)
-        lower = np.zeros(n)
+        values = np.asarray(self.signal if signal is None else signal,
+                            dtype=np.float64)
         half_window = window_size // 2
+        if half_window < 1:
+            raise ValueError("window_size doit être supérieur ou égal à 2.")
 
-        for i in range(n):
-            start = max(0, i - half_window)
-            end = min(n, i + half_window)
-            upper[i] = np.max(self.signal[start:end])
-            lower[i] = np.min(self.signal[start:end])
+        # Bords tronqués : équivalent à un remplissage par -inf (max) et +inf (min)
+        upper = maximum_filter1d(values, size=2 * half_window, axis=-1,
+                                 mode='constant', cval=-np.inf)
+        lower = minimum_filter1d(values, size=2 * half_window, axis=-1,
+                                 mode='constant', cval=np.inf)
 
-        self.envelope_minmax = (upper, lower)
+        if signal is None:
+            self.envelope_minmax = (upper, lower)
         return upper, lower
 
+    def compute_beat_amplitudes(self, rpeaks, method="minmax", window_size=200,
+                                distance=20, prominence=0.1, batch_size=4096):
+        """
+        Amplitude de l’enveloppe calculée uniquement aux R-peaks (sans enveloppe pleine longueur).
+
+        Le battement k est échantillonné en rpeaks[k] pour k < len(rpeaks) - 1 : le résultat
+        est directement aligné avec les intervalles R-R de PeakDetector. Les valeurs sont
+        identiques à (upper - lower)[rpeaks[:-1]] pour "minmax" et "interp".
+
+        Args:
+            rpeaks (np.ndarray) : Indices des R-peaks (PeakDetector.rpeaks)
+            method (str)        : "minmax", "interp" ou "hilbert"
+            window_size (int)   : Taille de la fenêtre locale ("minmax" et "hilbert")
+            distance (int)      : Distance minimale entre pics ("interp")
+            prominence (float)  : Seuil de proéminence des pics ("interp")
+            batch_size (int)    : Nombre de battements traités par lot (borne la mémoire)
+
+        Returns:
+            np.ndarray : Amplitude par battement, de longueur len(rpeaks) - 1
+        """
+        signal = np.asarray(self.signal, dtype=np.float64)
+        beats = np.asarray(rpeaks, dtype=np.int64)[:-1]
+
+        if method == "interp":
+            if self.envelope_interp is not None:
+                upper, lower = self.envelope_interp
+                amp = upper[beats] - lower[beats]
+            else:
+                # Mêmes pics que compute_interpolated_envelope, interpolés aux seuls battements
+                n = len(signal)
+                max_peaks, _ = find_peaks(
+                    signal, distance=distance, prominence=prominence)
+                min_peaks, _ = find_peaks(-signal,
+                                          distance=distance, prominence=prominence)
+                max_peaks = np.union1d(max_peaks, [0, n - 1])
+                min_peaks = np.union1d(min_peaks, [0, n - 1])
+                amp = (np.interp(beats, max_peaks, signal[max_peaks])
+                       - np.interp(beats, min_peaks, signal[min_peaks]))
+
+        elif method in ("minmax", "hilbert"):
+            half_window = window_size // 2
+            if half_window < 1:
+                raise ValueError("window_size doit être supérieur ou égal à 2.")
+
+            # Fenêtre [i - h, i + h[ ; le padding par répétition des bords équivaut
+            # à la troncature de compute_minmax_envelope
+            padded = np.pad(signal, half_window, mode='edge')
+            windows = np.lib.stride_tricks.sliding_window_view(
+                padded, 2 * half_window)
+
+            amp = np.empty(len(beats))
+            for start in range(0, len(beats), batch_size):
+                local = windows[beats[start:start + batch_size]]
+                if method == "minmax":
+                    amp[start:start + batch_size] = (local.max(axis=1)
+                                                     - local.min(axis=1))
+                else:
+                    amp[start:start + batch_size] = np.abs(
+                        hilbert(local, axis=1)[:, half_window])
+
+        else:
+            raise ValueError(f"Méthode inconnue : {method}")
+
+        self.beat_amplitudes = amp
+        return amp
+
     def analyze_envelope_amplitude(self, method="hilbert"):
         """
         Calcule les statistiques d’amplitude selon la méthode choisie.
@@ -135,7 +285,8 @@ class AmplitudeAnalyzer:
             "max_amplitude": np.max(amp)
         }
 
-    def plot_envelope(self, method="hilbert", show=True, save_path=None):
+    def plot_envelope(self, method="hilbert", show=True, save_path=None, downsample=True,
+                      headless=False):
         """
         Affiche le signal et son enveloppe (méthode au choix).
 
@@ -143,41 +294,72 @@ class AmplitudeAnalyzer:
             method (str)       : Méthode d’enveloppe à tracer ("hilbert", "interp", "minmax")
             show (bool)        : Afficher directement la figure (par défaut True)
             save_path (str|None): Chemin de sauvegarde optionnel
+            downsample (bool)  : Réduire les séries à la résolution de la figure
+            headless (bool)    : Figure Agg hors pyplot, renvoyée sans affichage (FigureRenderer)
+
+        Returns:
+            Figure : Figure créée
         """
-        plt.figure(figsize=(14, 4))
-        plt.plot(self.time, self.signal, label="Signal", alpha=0.6)
+        fig, ax = FigureRenderer.new_figure((14, 4), headless)
+        reducer = PlotDownsampler(fig, enabled=downsample)
+        ax.plot(*reducer.reduce(self.time, self.signal), label="Signal", alpha=0.6)
 
         if method == "hilbert":
             if self.envelope_hilbert is None:
                 self.compute_hilbert_envelope()
-            plt.plot(self.time, self.envelope_hilbert,
-                     color="red", label="Enveloppe (Hilbert)")
+            ax.plot(*reducer.reduce(self.time, self.envelope_hilbert),
+                    color="red", label="Enveloppe (Hilbert)")
 
         elif method == "interp":
             if self.envelope_interp is None:
                 self.compute_interpolated_envelope()
             upper, lower = self.envelope_interp
-            plt.plot(self.time, upper, color="red", label="Enveloppe sup.")
-            plt.plot(self.time, lower, color="blue", label="Enveloppe inf.")
+            ax.plot(*reducer.reduce(self.time, upper), color="red", label="Enveloppe sup.")
+            ax.plot(*reducer.reduce(self.time, lower), color="blue", label="Enveloppe inf.")
 
         elif method == "minmax":
             if self.envelope_minmax is None:
                 self.compute_minmax_envelope()
             upper, lower = self.envelope_minmax
-            plt.plot(self.time, upper, color="orange", label="Enveloppe sup.")
-            plt.plot(self.time, lower, color="green", label="Enveloppe inf.")
+            ax.plot(*reducer.reduce(self.time, upper), color="orange", label="Enveloppe sup.")
+            ax.plot(*reducer.reduce(self.time, lower), color="green", label="Enveloppe inf.")
         else:
             raise ValueError(f"Méthode d'enveloppe inconnue : {method}")
 
-        plt.title(f"Enveloppe du signal ({method})")
-        plt.xlabel("Temps (s)")
-        plt.ylabel("Amplitude")
-        plt.grid(True)
-        plt.legend()
-
-        if save_path:
-            plt.savefig(save_path)
-        if show:
-            plt.show()
-        else:
-            plt.close()
+        ax.set_title(f"Enveloppe du signal ({method})")
+        ax.set_xlabel("Temps (s)")
+        ax.set_ylabel("Amplitude")
+        ax.grid(True)
+        ax.legend()
+        return FigureRenderer.finish(fig, save_path, show, headless)
+
+
+if __name__ == "__main__":
+    # Benchmark : enveloppe min/max glissante selon n et window_size
+    import time
+
+    rng = np.random.default_rng(0)
+
+    # Vérification contre la boucle historique sur un signal court
+    x = rng.standard_normal(5000)
+    analyzer = AmplitudeAnalyzer(x, np.arange(len(x)) / 200)
+    for w in [2, 3, 200, 1001]:
+        h = w // 2
+        ref_up = [np.max(x[max(0, i - h):min(len(x), i + h)]) for i in range(len(x))]
+        ref_lo = [np.min(x[max(0, i - h):min(len(x), i + h)]) for i in range(len(x))]
+        up, lo = analyzer.compute_minmax_envelope(window_size=w)
+        assert np.array_equal(up, ref_up) and np.array_equal(lo, ref_lo)
+    print("Identique à la boucle historique.")
+
+    for n in [10_000, 100_000, 1_000_000, 10_000_000]:
+        x = rng.standard_normal(n)
+        analyzer = AmplitudeAnalyzer(x, np.arange(n) / 200)
+        for w in [200, 2000, 20000]:
+            start = time.perf_counter()
+            analyzer.compute_minmax_envelope(window_size=w)
+            print(f"n={n:>10} window={w:>6} : {time.perf_counter() - start:.3f} s")
+
+    x = rng.standard_normal((8, 1_000_000))
+    start = time.perf_counter()
+    analyzer.compute_minmax_envelope(window_size=200, signal=x)
+    print(f"2-D (8 x 1e6) window=200 : {time.perf_counter() - start:.3f} s")
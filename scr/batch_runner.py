@@ -0,0 +1,264 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from pipeline import Pipeline
+from recording_dataset import RecordingDataset
+
+
+class BatchRunner:
+    """
+    Traitement par lots d’un dossier d’enregistrements (.txt) : chargement, R-peaks,
+    amplitude, tendance et, en option, synthèse (avec ou sans bruit), via Pipeline.
+
+    Les enregistrements sont répartis sur un pool de processus ; le résultat de chacun est
+    écrit dès qu’il est terminé, sous forme d’une ligne JSON dans le fichier de sortie
+    (JSONL). Chaque ligne porte l’empreinte de la configuration (paramètres effectifs du
+    Pipeline et étapes exécutées). À la reprise après une interruption, les enregistrements
+    déjà présents avec le statut "ok" et la même configuration sont ignorés ; les échecs et
+    les résultats d’une autre configuration sont recalculés. Le débit total et le temps
+    passé dans chaque étape sont résumés à la fin.
+
+    Attributs :
+        root (str)         : Dossier racine des enregistrements
+        output (str)       : Fichier de résultats (JSONL)
+        n_jobs (int|None)  : Nombre de processus (None : nombre de cœurs)
+        targets (tuple)    : Étapes du Pipeline exécutées pour chaque enregistrement
+        params (dict)      : Paramètres transmis au Pipeline {étape: {paramètre: valeur}}
+                             (DEFAULT_PARAMS complétés par ceux de l’appelant)
+        config (str)       : Empreinte de la configuration (paramètres effectifs et étapes)
+    """
+
+    # Réglages propres au traitement par lots, sous les paramètres de l’appelant :
+    # enregistrements entiers et tendance par spline par paquets (longues durées)
+    DEFAULT_PARAMS = {
+        "load": {"start_time": None, "end_time": None},
+        "trend": {"method": "binned"},
+    }
+
+    def __init__(self, root="../data", output="../results/batch.jsonl", n_jobs=None,
+                 synthesize=False, noise=False, params=None):
+        """
+        Args:
+            root (str)        : Dossier racine à parcourir
+            output (str)      : Fichier de résultats JSONL (complété s’il existe)
+            n_jobs (int|None) : Nombre de processus
+            synthesize (bool) : Ajouter la synthèse du signal
+            noise (bool)      : Ajouter la synthèse bruitée
+            params (dict|None): Paramètres du Pipeline {étape: {paramètre: valeur}}, appliqués
+                                par-dessus DEFAULT_PARAMS
+        """
+        self.root = root
+        self.output = output
+        self.n_jobs = n_jobs
+        self.params = {stage: dict(values) for stage, values in self.DEFAULT_PARAMS.items()}
+        for stage, values in (params or {}).items():
+            self.params.setdefault(stage, {}).update(values)
+
+        targets = ["peaks", "amplitude", "trend"]
+        if synthesize:
+            targets.append("synthesis")
+        if noise:
+            targets.append("noisy_synthesis")
+        self.targets = tuple(targets)
+        self.config = self._config_hash()
+
+    def _config_hash(self):
+        """Empreinte des paramètres effectifs (défauts du Pipeline compris) et des étapes."""
+        effective = Pipeline(params=self.params).params
+        effective["load"].pop("filepath")
+        payload = json.dumps({"params": effective, "targets": self.targets},
+                             sort_keys=True, default=repr)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _records(self):
+        """Lignes valides du fichier de sortie."""
+        if not os.path.exists(self.output):
+            return
+        with open(self.output, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue    # Dernière ligne tronquée par une interruption
+
+    def completed(self):
+        """
+        Enregistrements déjà traités avec succès, avec la configuration courante, dans le
+        fichier de sortie.
+
+        Returns:
+            set : Identifiants des enregistrements au statut "ok" et de même config
+        """
+        return {record["recording"] for record in self._records()
+                if record.get("status") == "ok" and record.get("config") == self.config}
+
+    @staticmethod
+    def _to_json(value):
+        """Convertit récursivement les types NumPy en types JSON natifs."""
+        if isinstance(value, dict):
+            return {key: BatchRunner._to_json(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [BatchRunner._to_json(item) for item in value]
+        if isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, float) and not np.isfinite(value):
+            return None
+        return value
+
+    @staticmethod
+    def _summary(values):
+        """Moyenne, écart-type, minimum et maximum d’une série (None si vide)."""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return None
+        return {"mean": np.mean(values), "std": np.std(values),
+                "min": np.min(values), "max": np.max(values)}
+
+    @staticmethod
+    def _process(key, filepath, targets, params, config):
+        """
+        Traite un enregistrement dans un processus de travail.
+
+        Returns:
+            dict : Résultat sérialisable (statistiques, durées par étape)
+        """
+        start = time.perf_counter()
+        record = {"recording": key, "path": filepath, "config": config}
+        try:
+            stage_params = {stage: dict(values) for stage, values in params.items()}
+            stage_params.setdefault("load", {})["filepath"] = filepath
+            pipeline = Pipeline(params=stage_params, n_jobs=2)
+            outputs = pipeline.run(targets)
+
+            load, peaks = outputs["load"], outputs["peaks"]
+            record.update({
+                "status": "ok",
+                "n_samples": len(load["signal"]),
+                "duration_s": len(load["signal"]) / load["sampling_rate"],
+                "num_peaks": len(peaks["rpeaks"]),
+                "rr_stats": peaks["stats"],
+                "amplitude": BatchRunner._summary(outputs["amplitude"]),
+                "trend": BatchRunner._summary(outputs["trend"]),
+            })
+            for stage in ("synthesis", "noisy_synthesis"):
+                if stage in outputs:
+                    record[stage] = {"n_samples": len(outputs[stage]["signal"]),
+                                     "signal": BatchRunner._summary(outputs[stage]["signal"])}
+            record["timings"] = {stage: info["seconds"]
+                                 for stage, info in pipeline.last_run.items()}
+        except Exception as error:
+            record.update({"status": "error", "error": f"{type(error).__name__}: {error}"})
+        record["elapsed_s"] = time.perf_counter() - start
+        return BatchRunner._to_json(record)
+
+    def run(self, overwrite=False):
+        """
+        Traite tous les enregistrements non encore terminés.
+
+        Args:
+            overwrite (bool) : Repartir de zéro (fichier de sortie vidé) au lieu de reprendre
+
+        Returns:
+            dict : Résumé (enregistrements traités, ignorés, en échec, débit, durées par étape)
+        """
+        recordings = RecordingDataset(self.root).recordings
+        os.makedirs(os.path.dirname(self.output) or ".", exist_ok=True)
+        if overwrite and os.path.exists(self.output):
+            os.remove(self.output)
+
+        done = self.completed()
+        todo = {key: path for key, path in recordings.items() if key not in done}
+        other = {record["recording"] for record in self._records()
+                 if record.get("status") == "ok" and record.get("config") != self.config}
+        if other & set(todo):
+            print(f"{len(other & set(todo))} enregistrement(s) déjà traité(s) avec une autre "
+                  f"configuration dans {self.output} : recalculé(s) (config {self.config})")
+
+        start = time.perf_counter()
+        stage_seconds, n_ok, n_failed, n_samples = {}, 0, 0, 0
+        with open(self.output, "a", encoding="utf-8") as out, \
+                ProcessPoolExecutor(max_workers=self.n_jobs) as pool:
+            futures = [pool.submit(self._process, key, path, self.targets, self.params,
+                                   self.config)
+                       for key, path in todo.items()]
+            for future in as_completed(futures):
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+
+                if record["status"] == "ok":
+                    n_ok += 1
+                    n_samples += record["n_samples"]
+                    for stage, seconds in record["timings"].items():
+                        stage_seconds[stage] = stage_seconds.get(stage, 0.0) + seconds
+                    print(f"[ok]     {record['recording']} ({record['elapsed_s']:.2f} s)")
+                else:
+                    n_failed += 1
+                    print(f"[erreur] {record['recording']} : {record['error']}")
+
+        elapsed = time.perf_counter() - start
+        return {
+            "processed": n_ok,
+            "failed": n_failed,
+            "skipped": len(done),
+            "elapsed_s": elapsed,
+            "recordings_per_s": n_ok / elapsed if elapsed > 0 else None,
+            "samples_per_s": n_samples / elapsed if elapsed > 0 else None,
+            "stage_seconds": stage_seconds,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Traitement par lots des enregistrements .txt d’un dossier (pipeline PRONTO).")
+    parser.add_argument("root", nargs="?", default="../data",
+                        help="Dossier racine des enregistrements (par défaut ../data)")
+    parser.add_argument("-o", "--output", default="../results/batch.jsonl",
+                        help="Fichier de résultats JSONL (repris s’il existe)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Nombre de processus (par défaut : nombre de cœurs)")
+    parser.add_argument("--synthesize", action="store_true", help="Ajouter la synthèse du signal")
+    parser.add_argument("--noise", action="store_true", help="Ajouter la synthèse bruitée")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Ignorer les résultats existants et repartir de zéro")
+    parser.add_argument("--interval-ms", type=float, default=5)
+    parser.add_argument("--channel", default="HR")
+    parser.add_argument("--distance-sec", type=float, default=0.4)
+    parser.add_argument("--prominence", type=float, default=3)
+    parser.add_argument("--trend-method", choices=["binned", "rolling", "spline", "combined"],
+                        default="binned",
+                        help="binned : spline par paquets, adaptée aux longs enregistrements ; "
+                             "spline / combined : spline sur tous les échantillons (lente)")
+    parser.add_argument("--knot-spacing", type=float, default=5.0,
+                        help="Espacement des nœuds de la spline par paquets (en s)")
+    args = parser.parse_args(argv)
+
+    params = {
+        "load": {"interval_ms": args.interval_ms, "channel": args.channel},
+        "peaks": {"distance_sec": args.distance_sec, "prominence": args.prominence},
+        "trend": {"method": args.trend_method, "knot_spacing": args.knot_spacing},
+    }
+    runner = BatchRunner(args.root, args.output, n_jobs=args.jobs,
+                         synthesize=args.synthesize, noise=args.noise, params=params)
+    summary = runner.run(overwrite=args.overwrite)
+
+    print(f"\n{summary['processed']} traités, {summary['skipped']} déjà faits, "
+          f"{summary['failed']} en échec, en {summary['elapsed_s']:.1f} s")
+    if summary["processed"]:
+        print(f"Débit : {summary['recordings_per_s']:.2f} enregistrements/s, "
+              f"{summary['samples_per_s'] / 1e6:.2f} Méch/s")
+        total = sum(summary["stage_seconds"].values())
+        for stage, seconds in sorted(summary["stage_seconds"].items(), key=lambda kv: -kv[1]):
+            print(f"  {stage:<16} {seconds:8.2f} s ({100 * seconds / total:.0f} %)")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,11 @@
+import os
+import subprocess
+
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
 
 
 class CardioVisualizer:
@@ -25,52 +30,194 @@ class CardioVisualizer:
 
         self.frames = len(self.time)
 
-    def animate(self, save_path="output/cardiogramme_final.gif"):
-        """Génère un GIF animé ECG à partir d’un segment temporel contrôlé"""
-        window_size = int(self.window_seconds * self.sampling_rate)
-
-        fig, ax = plt.subplots(figsize=(10, 4))
+    def _frame_ends(self, fps=25, speed=None):
+        """
+        Index de fin de fenêtre de chaque image.
+
+        speed=None : une image par échantillon (comportement historique).
+        Sinon, l’animation avance de speed × sampling_rate / fps échantillons par image :
+        le nombre d’images ne dépend que de la durée de sortie (durée / speed × fps).
+        """
+        if speed is None:
+            return np.arange(self.frames)
+        step = speed * self.sampling_rate / fps
+        n_frames = int(np.floor((self.frames - 1) / step)) + 1
+        return np.minimum(np.round(np.arange(n_frames) * step).astype(int) + 1, self.frames)
+
+    def _setup_figure(self, title="Visualisation ECG (GIF animé)", dpi=None):
+        """Crée la figure, l’axe et la ligne animée."""
+        fig, ax = plt.subplots(figsize=(10, 4), dpi=dpi)
         ax.set_xlim(0, self.window_seconds)
         ax.set_ylim(np.min(self.signal), np.max(self.signal))
         ax.set_xlabel("Temps (s)")
         ax.set_ylabel("Amplitude")
-        ax.set_title("Visualisation ECG (GIF animé)")
+        ax.set_title(title)
         ax.grid(True)
 
         line, = ax.plot([], [], lw=2, color='crimson')
+        return fig, ax, line
 
-        def init():
-            line.set_data([], [])
+    def _update_line(self, line, end, window_size):
+        """Affiche les window_size échantillons précédant end, temps recentré sur la fenêtre."""
+        start = max(0, end - window_size)
+        if end <= start:
             return line,
 
-        def update(i):
-            start = max(0, i - window_size)
-            end = i
+        x = self.time[start:end]
+        y = self.signal[start:end]
 
-            if end <= start:
-                return line,
+        min_len = min(len(x), len(y))
+        if min_len == 0:
+            return line,
 
-            x = self.time[start:end]
-            y = self.signal[start:end]
+        x = x[:min_len] - x[:min_len][0]  # recentrer le temps local
+        y = y[:min_len]
+
+        line.set_data(x, y)
+        return line,
+
+    @staticmethod
+    def _resolve_writer(writer, save_path):
+        """
+        Choisit l’encodeur : "auto" prend ffmpeg s’il est installé, sinon pillow (GIF).
+        Sans ffmpeg, une sortie .mp4 est remplacée par un .gif.
+        """
+        if writer == "auto":
+            writer = "ffmpeg" if animation.writers.is_available("ffmpeg") else "pillow"
+        elif writer == "ffmpeg" and not animation.writers.is_available("ffmpeg"):
+            print("ffmpeg introuvable : encodage GIF avec pillow à la place.")
+            writer = "pillow"
+
+        if writer == "pillow" and not save_path.lower().endswith(".gif"):
+            save_path = os.path.splitext(save_path)[0] + ".gif"
+        return writer, save_path
+
+    def animate(self, save_path="output/cardiogramme_final.gif", fps=25, speed=None,
+                writer="pillow", dpi=None):
+        """
+        Génère une animation ECG (GIF ou MP4) à partir d’un segment temporel contrôlé.
+
+        Avec speed=None, une image par échantillon via FuncAnimation (historique). Sinon,
+        les images sont rendues par blitting (iter_frames) et envoyées en flux à l’encodeur :
+        le temps de rendu est proportionnel à la durée de la sortie.
+
+        Args:
+            save_path (str)   : Fichier de sortie (.gif, ou .mp4 avec ffmpeg)
+            fps (float)       : Images par seconde de la sortie
+            speed (float|None): Vitesse de lecture (1.0 = temps réel) ; None : une image
+                                par échantillon (très lent sur de longs segments)
+            writer (str)      : "pillow", "ffmpeg" ou "auto" (ffmpeg si disponible)
+            dpi (float|None)  : Résolution de la figure
+
+        Returns:
+            str : Chemin du fichier écrit
+        """
+        writer, save_path = self._resolve_writer(writer, save_path)
+        os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+
+        if speed is None:
+            self._animate_per_sample(save_path, fps, writer, dpi)
+        elif writer == "ffmpeg":
+            self._encode_ffmpeg(self.iter_frames(fps, speed, dpi or 100), save_path, fps)
+        else:
+            frames = (Image.fromarray(frame) for frame in self.iter_frames(fps, speed, dpi or 100))
+            first = next(frames)
+            first.save(save_path, save_all=True, append_images=frames,
+                       duration=1000 / fps, loop=0)
 
-            min_len = min(len(x), len(y))
-            if min_len == 0:
-                return line,
+        print(f"Animation enregistrée : {save_path}")
+        return save_path
 
-            x = x[:min_len] - x[:min_len][0]  # recentrer le temps local
-            y = y[:min_len]
+    def _animate_per_sample(self, save_path, fps, writer, dpi):
+        """Animation historique : une image par échantillon, via FuncAnimation."""
+        window_size = int(self.window_seconds * self.sampling_rate)
+        fig, ax, line = self._setup_figure(dpi=dpi)
 
-            line.set_data(x, y)
+        def init():
+            line.set_data([], [])
             return line,
 
+        def update(i):
+            return self._update_line(line, i, window_size)
+
         ani = animation.FuncAnimation(
             fig, update, init_func=init, frames=self.frames,
             blit=True, interval=20
         )
-
-        import os
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-
-        ani.save(save_path, writer='pillow', fps=25)
-        print(f"GIF animé enregistré : {save_path}")
-        plt.close()
+        ani.save(save_path, writer=writer, fps=fps, dpi=dpi)
+        plt.close(fig)
+
+    @staticmethod
+    def _encode_ffmpeg(frames, save_path, fps):
+        """Encode en flux des images RGB (uint8) avec ffmpeg (H.264), via un pipe."""
+        process = None
+        try:
+            for frame in frames:
+                if process is None:
+                    height, width = frame.shape[:2]
+                    command = [animation.writers["ffmpeg"].bin_path(), "-y", "-loglevel", "error",
+                               "-f", "rawvideo", "-pix_fmt", "rgb24",
+                               "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                               "-vcodec", "libx264", "-pix_fmt", "yuv420p",
+                               # H.264 impose des dimensions paires
+                               "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", save_path]
+                    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+                process.stdin.write(frame.tobytes())
+        finally:
+            if process is not None:
+                process.stdin.close()
+                if process.wait() != 0:
+                    raise RuntimeError(f"Échec de l’encodage ffmpeg : {save_path}")
+
+    def iter_frames(self, fps=25, speed=1.0, dpi=100):
+        """
+        Rend les images de l’animation en mémoire, par blitting (le fond et les axes sont
+        dessinés une seule fois, seule la ligne est redessinée). Permet d’alimenter
+        n’importe quel encodeur en flux (ex. imageio, pipe ffmpeg) sans fichier intermédiaire.
+
+        Args:
+            fps (float)   : Images par seconde de la sortie
+            speed (float) : Vitesse de lecture (1.0 = temps réel)
+            dpi (float)   : Résolution de la figure
+
+        Yields:
+            np.ndarray : Image RGB (hauteur, largeur, 3) en uint8
+        """
+        window_size = int(self.window_seconds * self.sampling_rate)
+        fig, ax, line = self._setup_figure(dpi=dpi)
+        line.set_animated(True)
+        canvas = FigureCanvasAgg(fig)
+
+        try:
+            canvas.draw()
+            background = canvas.copy_from_bbox(fig.bbox)
+            for end in self._frame_ends(fps, speed):
+                canvas.restore_region(background)
+                self._update_line(line, end, window_size)
+                ax.draw_artist(line)
+                yield np.asarray(canvas.buffer_rgba())[..., :3].copy()
+        finally:
+            plt.close(fig)
+
+
+if __name__ == "__main__":
+    # Benchmark : une image par échantillon vs images dérivées de fps et de la vitesse
+    import tempfile
+    import time
+
+    fs = 200
+    t = np.arange(0, 6, 1 / fs)
+    signal = np.sin(2 * np.pi * 1.2 * t) ** 31 * 20 + 60
+    viz = CardioVisualizer(signal, t, window_seconds=5, sampling_rate=fs)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for speed in [None, 1.0]:
+            start = time.perf_counter()
+            viz.animate(os.path.join(tmp, "ecg.gif"), fps=25, speed=speed)
+            print(f"speed={speed} : {len(viz._frame_ends(25, speed))} images, "
+                  f"{time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    n_frames = sum(1 for _ in viz.iter_frames(fps=25, speed=1.0))
+    elapsed = time.perf_counter() - start
+    print(f"iter_frames : {n_frames} images en {elapsed:.2f} s ({n_frames / elapsed:.0f} images/s)")
@@ -0,0 +1,155 @@
+import numpy as np
+import hashlib
+import os
+
+
+class ColumnCache:
+    """
+    Cache disque des colonnes nettoyées par DataLoader, au format binaire NumPy (.npy).
+
+    Chaque enregistrement est stocké sous forme d'un tableau (n_colonnes, n_points) en float64,
+    relu par memory-map : un second chargement ne reparse pas le texte et les pages sont
+    partagées entre processus. La clé dépend du chemin source, de sa taille, de sa date de
+    modification et de interval_ms : toute modification du fichier invalide l'entrée. Seuls
+    les enregistrements comportant toutes les colonnes sont mis en cache.
+
+    Attributs :
+        cache_dir (str)  : Dossier de stockage du cache
+        max_bytes (int)  : Taille totale maximale du cache (éviction LRU au-delà)
+        columns (list)   : Colonnes stockées, dans l'ordre
+    """
+
+    def __init__(self, cache_dir="../cache", max_bytes=2 * 1024 ** 3):
+        """
+        Args:
+            cache_dir (str) : Dossier de stockage (créé si besoin)
+            max_bytes (int) : Taille maximale du cache en octets (par défaut 2 Go)
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.columns = ["Time", "HR", "Av BP", "BP", "D", "BP2"]
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _source_id(self, filepath, interval_ms):
+        """Identifiant stable d'une source (chemin absolu et interval_ms)."""
+        source = f"{os.path.abspath(filepath)}:{float(interval_ms)}"
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+    def _entry_path(self, filepath, interval_ms):
+        """
+        Chemin de l'entrée correspondant à l'état actuel du fichier source.
+
+        Returns:
+            str : Chemin du fichier .npy (qu'il existe ou non)
+        """
+        stat = os.stat(filepath)
+        version = f"{stat.st_size}:{stat.st_mtime_ns}"
+        version_id = hashlib.sha1(version.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir,
+                            f"{self._source_id(filepath, interval_ms)}-{version_id}.npy")
+
+    def get(self, filepath, interval_ms):
+        """
+        Relit une entrée du cache si elle est à jour.
+
+        Args:
+            filepath (str)      : Fichier source
+            interval_ms (float) : Intervalle d'échantillonnage utilisé au chargement
+
+        Returns:
+            np.ndarray | None : Tableau memory-mappé (n_colonnes, n_points), ou None si absent
+        """
+        path = self._entry_path(filepath, interval_ms)
+        try:
+            # Mise à jour de la date d'accès pour l'éviction LRU
+            os.utime(path)
+            return np.load(path, mmap_mode='r')
+        except FileNotFoundError:
+            return None     # Absente, ou supprimée entre-temps par un autre processus
+
+    def put(self, filepath, interval_ms, data):
+        """
+        Enregistre les colonnes nettoyées d'un fichier et supprime ses anciennes versions.
+
+        Args:
+            filepath (str)      : Fichier source
+            interval_ms (float) : Intervalle d'échantillonnage utilisé au chargement
+            data (pd.DataFrame) : Données nettoyées (issues de DataLoader.load)
+
+        Returns:
+            str | None : Chemin de l'entrée écrite (None si elle dépasse à elle seule max_bytes
+            ou s'il manque des colonnes)
+        """
+        # Enregistrement à moins de colonnes (ex. sans BP2) : relu tel quel, pas de cache
+        if any(col not in data.columns for col in self.columns):
+            return None
+
+        path = self._entry_path(filepath, interval_ms)
+        values = np.ascontiguousarray(
+            data[self.columns].to_numpy(dtype=np.float64).T)
+
+        # Une entrée plus grande que le cache entier serait aussitôt évincée : pas de cache
+        if values.nbytes > self.max_bytes:
+            return None
+
+        # Écriture atomique : un autre processus ne lit jamais un fichier partiel
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, values)
+        os.replace(tmp_path, path)
+
+        # Les versions précédentes du même fichier source sont obsolètes
+        prefix = self._source_id(filepath, interval_ms) + "-"
+        for name in os.listdir(self.cache_dir):
+            entry = os.path.join(self.cache_dir, name)
+            if name.startswith(prefix) and name.endswith(".npy") and entry != path:
+                try:
+                    os.remove(entry)
+                except FileNotFoundError:
+                    pass
+
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """
+        Supprime les entrées les moins récemment utilisées tant que le cache dépasse max_bytes.
+
+        Args:
+            keep (str|None) : Entrée à ne jamais supprimer (ex. celle qui vient d'être écrite)
+
+        Returns:
+            int : Nombre d'entrées supprimées
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npy"):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            if keep is not None and os.path.join(self.cache_dir, name) == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass  # Déjà supprimée par un autre processus
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        """
+        Vide entièrement le cache.
+        """
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npy"):
+                os.remove(os.path.join(self.cache_dir, name))
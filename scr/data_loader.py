@@ -1,8 +1,10 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
+from plot_downsampler import PlotDownsampler
+from figure_renderer import FigureRenderer
+
 
 class DataLoader:
     """
@@ -12,20 +14,28 @@ class DataLoader:
         filepath (str)         : Chemin vers le fichier de données (.txt)
         interval_ms (float)    : Intervalle d'échantillonnage en millisecondes (par défaut 5 ms → 200 Hz)
         data (pd.DataFrame)    : Données brutes chargées et nettoyées
+        cache (ColumnCache)    : Cache binaire des colonnes nettoyées (facultatif)
     """
 
-    def __init__(self, filepath, interval_ms=5):
+    def __init__(self, filepath, interval_ms=5, cache=None):
         self.filepath = filepath
         self.interval_ms = interval_ms
+        self.cache = cache
         self.data = None
         self.columns_full = ["Time", "HR", "Av BP",
                              "BP", "D", "BP2", "Comment", "Extra"]
         self.useful_cols = ["HR", "Av BP", "BP", "D", "BP2"]
 
-    def load(self):
+    def load(self, engine="python"):
         """
         Charge le fichier texte, nettoie les colonnes numériques,
         supprime les colonnes inutiles et ajoute une colonne temporelle.
+        Si un cache est fourni, les colonnes à jour y sont relues (memory-map)
+        sans reparser le texte, et y sont enregistrées après un chargement.
+
+        Args:
+            engine (str) : "python" (lecture historique, conversion texte → float)
+                           ou "c" (lecture rapide, virgule décimale parsée nativement)
 
         Returns:
             pd.DataFrame : Données nettoyées avec colonne "Time"
@@ -33,6 +43,41 @@ class DataLoader:
         if not os.path.exists(self.filepath):
             raise FileNotFoundError(f"Fichier introuvable : {self.filepath}")
 
+        if self.cache is not None:
+            cached = self.cache.get(self.filepath, self.interval_ms)
+            if cached is not None:
+                # Vue sur le memory-map, sans copie des colonnes
+                self.data = pd.DataFrame(
+                    cached.T, columns=self.cache.columns, copy=False)
+                return self.data
+
+        if engine == "c":
+            df = self._read_fast()
+        elif engine == "python":
+            df = self._read_python()
+        else:
+            raise ValueError(f"Moteur de lecture inconnu : {engine}")
+
+        # Suppression des lignes incomplètes
+        df.dropna(inplace=True)
+
+        # Génération d'une colonne temporelle
+        df["Time"] = np.arange(0, len(df)) * (self.interval_ms / 1000)
+
+        self.data = df.reset_index(drop=True)
+
+        if self.cache is not None:
+            self.cache.put(self.filepath, self.interval_ms, self.data)
+        return self.data
+
+    def _read_python(self):
+        """
+        Lecture historique : parseur Python, puis conversion des colonnes utiles
+        via remplacement de "," par "." sur leur représentation texte.
+
+        Returns:
+            pd.DataFrame : Colonnes "Time" (brute) et colonnes utiles converties
+        """
         # Chargement brut
         df = pd.read_csv(self.filepath, sep='\t', header=None,
                          encoding='ISO-8859-1', engine='python')
@@ -49,41 +94,128 @@ class DataLoader:
         # Suppression des colonnes non pertinentes
         df.drop(columns=[c for c in ["Comment", "Extra"]
                 if c in df.columns], inplace=True)
+        return df
 
-        # Suppression des lignes incomplètes
-        df.dropna(inplace=True)
+    def _read_fast(self):
+        """
+        Lecture rapide : parseur C de pandas, virgule décimale gérée à la lecture
+        et seules les colonnes utiles sont conservées (Comment/Extra ignorées,
+        même pour les lignes qui en contiennent).
 
-        # Génération d'une colonne temporelle
-        df["Time"] = np.arange(0, len(df)) * (self.interval_ms / 1000)
+        Returns:
+            pd.DataFrame : Colonnes "Time" (brute) et colonnes utiles en float64
+        """
+        # Les 8 noms sont imposés pour absorber les lignes à colonne "Extra" ;
+        # usecols n'est pas utilisable ici (pandas rejette alors les fichiers
+        # ou blocs dont aucune ligne n'a 8 champs)
+        df = pd.read_csv(self.filepath, sep='\t', header=None,
+                         names=self.columns_full, decimal=',',
+                         dtype={"Comment": str, "Extra": str},
+                         encoding='ISO-8859-1', engine='c')
+        df = df.drop(columns=["Comment", "Extra"])
 
-        self.data = df.reset_index(drop=True)
-        return self.data
+        # Une colonne contenant du texte invalide n'est pas convertie par le
+        # parseur : on se rabat alors sur la conversion historique
+        for col in self.useful_cols:
+            if pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = df[col].astype(np.float64)
+            else:
+                df[col] = pd.to_numeric(df[col].astype(
+                    str).str.replace(",", "."), errors='coerce')
+        return df
 
-    def crop_time_range(self, start_time, end_time):
+    def _index_range(self, start_time, end_time):
         """
-        Découpe une plage temporelle spécifique dans les données chargées.
+        Convertit une plage temporelle en bornes d'indices par recherche dichotomique
+        (l'axe "Time" est reconstruit, donc croissant) : O(log n), sans masque booléen.
 
         Args:
             start_time (float) : Temps de début en secondes
             end_time (float)   : Temps de fin en secondes
 
         Returns:
-            pd.DataFrame : Données restreintes à la plage choisie
+            Tuple[int, int] : indices [début, fin) des points tels que start_time <= t <= end_time
         """
         if self.data is None:
             raise ValueError(
                 "⚠️ Utilisez .load() avant de découper une plage.")
 
-        min_time, max_time = self.data["Time"].min(), self.data["Time"].max()
+        time = self.data["Time"].to_numpy()
+        if len(time) == 0:
+            return 0, 0
+
+        min_time, max_time = time[0], time[-1]
         if start_time < min_time or end_time > max_time:
             raise ValueError(
                 f"Plage temporelle invalide : {start_time}s → {end_time}s hors bornes [{min_time}s → {max_time}s]")
 
-        return self.data[
-            (self.data["Time"] >= start_time) & (self.data["Time"] <= end_time)
-        ].reset_index(drop=True)
+        start = np.searchsorted(time, start_time, side='left')
+        end = np.searchsorted(time, end_time, side='right')
+        return int(start), int(max(start, end))
+
+    def crop_time_range(self, start_time, end_time):
+        """
+        Découpe une plage temporelle spécifique dans les données chargées.
+
+        Args:
+            start_time (float) : Temps de début en secondes
+            end_time (float)   : Temps de fin en secondes
+
+        Returns:
+            pd.DataFrame : Données restreintes à la plage choisie (copie)
+        """
+        start, end = self._index_range(start_time, end_time)
+        return self.data.iloc[start:end].reset_index(drop=True)
+
+    def get_window(self, start_time, end_time, columns=None):
+        """
+        Accès sans copie à une plage temporelle : renvoie des vues NumPy
+        (ou des vues sur le memory-map si les données viennent du cache).
+
+        Args:
+            start_time (float) : Temps de début en secondes
+            end_time (float)   : Temps de fin en secondes
+            columns (list|None): Colonnes à extraire (par défaut toutes)
+
+        Returns:
+            dict : {colonne: np.ndarray} vues sur les données chargées
+        """
+        start, end = self._index_range(start_time, end_time)
+        columns = list(self.data.columns) if columns is None else columns
+        return {col: self.data[col].to_numpy()[start:end] for col in columns}
+
+    def iter_windows(self, window_seconds, hop_seconds=None, columns=None):
+        """
+        Parcourt les données par fenêtres glissantes de longueur fixe, sans copie.
+
+        Args:
+            window_seconds (float) : Durée de chaque fenêtre (en s)
+            hop_seconds (float)    : Pas entre deux fenêtres (en s), par défaut sans recouvrement
+            columns (list|None)    : Colonnes à extraire (par défaut toutes)
 
-    def plot(self, df_crop, save_path=None, show=True):
+        Yields:
+            Tuple[float, dict] : temps de début de la fenêtre et {colonne: vue np.ndarray}
+        """
+        if self.data is None:
+            raise ValueError(
+                "⚠️ Utilisez .load() avant de parcourir les données.")
+
+        step_s = self.interval_ms / 1000
+        window = int(round(window_seconds / step_s))
+        hop = window if hop_seconds is None else int(round(hop_seconds / step_s))
+        if window <= 0 or hop <= 0:
+            raise ValueError(
+                "La fenêtre et le pas doivent couvrir au moins un échantillon.")
+
+        columns = list(self.data.columns) if columns is None else columns
+        arrays = {col: self.data[col].to_numpy() for col in columns}
+        time = self.data["Time"].to_numpy()
+
+        for start in range(0, len(time) - window + 1, hop):
+            yield time[start], {col: arr[start:start + window]
+                                for col, arr in arrays.items()}
+
+    def plot(self, df_crop, save_path=None, show=True, downsample=True, headless=False):
         """
         Affiche (et optionnellement enregistre) chaque signal contenu dans df_crop.
 
@@ -91,25 +223,76 @@ class DataLoader:
             df_crop (pd.DataFrame) : Données à tracer (issues de crop_time_range)
             save_path (str)        : Dossier dans lequel enregistrer les figures (facultatif)
             show (bool)            : Affiche les figures à l’écran (True) ou non (False)
+            downsample (bool)      : Réduire les séries à la résolution de la figure (PlotDownsampler)
+            headless (bool)        : Figures Agg hors pyplot, renvoyées sans affichage (FigureRenderer)
+
+        Returns:
+            list : Figures créées (une par signal)
         """
         time_col = "Time"
         signal_cols = [col for col in df_crop.columns if col != time_col]
 
+        figures = []
         for col in signal_cols:
-            plt.figure(figsize=(12, 4))
-            plt.plot(df_crop[time_col], df_crop[col], label=col)
-            plt.title(f"Signal brut - {col}")
-            plt.xlabel("Temps (s)")
-            plt.ylabel("Amplitude")
-            plt.grid(True)
-            plt.legend()
+            fig, ax = FigureRenderer.new_figure((12, 4), headless)
+            reducer = PlotDownsampler(fig, enabled=downsample)
+            ax.plot(*reducer.reduce(df_crop[time_col], df_crop[col]), label=col)
+            ax.set_title(f"Signal brut - {col}")
+            ax.set_xlabel("Temps (s)")
+            ax.set_ylabel("Amplitude")
+            ax.grid(True)
+            ax.legend()
 
+            filename = None
             if save_path:
                 filename = f"{save_path}/{col}_raw_plot.png"
-                plt.savefig(filename)
+            figures.append(FigureRenderer.finish(fig, filename, show, headless))
+            if filename:
                 print(f"Figure enregistrée : {filename}")
+        return figures
 
-            if show:
-                plt.show()
-            else:
-                plt.close()
+
+if __name__ == "__main__":
+    # Benchmark : lecture historique vs lecture rapide sur un fichier généré
+    import sys
+    import tempfile
+    import time
+
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    rng = np.random.default_rng(0)
+    t = np.arange(n_rows) * 0.005
+    cols = [t, 60 + 15 * rng.standard_normal(n_rows),
+            np.round(60 + rng.standard_normal(n_rows), 4),
+            np.round(120 + rng.standard_normal(n_rows), 2),
+            1e-5 * rng.standard_normal(n_rows),
+            np.round(120 + rng.standard_normal(n_rows), 4)]
+    table = pd.DataFrame({f"c{i}": c for i, c in enumerate(cols)})
+    table["Comment"] = ""
+    table.loc[::100_000, "Comment"] = "#* injection"
+    table.loc[n_rows // 2:n_rows // 2 + 50, ["c2", "c3", "c5"]] = np.nan
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.txt")
+        text = table.to_csv(sep='\t', header=False, index=False,
+                            decimal=',', na_rep="NaN", lineterminator='\r')
+        # Lignes commentées : colonne "Extra" vide supplémentaire
+        text = text.replace("#* injection\r", "#* injection\t\r")
+        with open(path, "w", encoding="ISO-8859-1") as f:
+            f.write(text)
+        print(f"Fichier généré : {n_rows} lignes, "
+              f"{os.path.getsize(path) / 1e6:.1f} Mo")
+
+        results = {}
+        for engine in ["c", "python"]:
+            loader = DataLoader(path)
+            start = time.perf_counter()
+            try:
+                results[engine] = loader.load(engine=engine)
+            except pd.errors.ParserError as e:
+                print(f"engine={engine:<7}: échec ({e})")
+                continue
+            print(f"engine={engine:<7}: {time.perf_counter() - start:.2f} s")
+
+        if len(results) == 2:
+            pd.testing.assert_frame_equal(results["c"], results["python"])
+            print("Résultats identiques.")
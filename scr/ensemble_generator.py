@@ -0,0 +1,234 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from noise_injector import NoiseInjector
+from signal_generator import SignalGenerator
+
+
+class EnsembleGenerator:
+    """
+    Génération en parallèle de nombreuses variantes bruitées d’un même signal synthétique
+    (augmentation de données), à partir des R-R, amplitudes et tendance d’un enregistrement réel.
+
+    Chaque réalisation reproduit la chaîne du notebook (NoiseInjector sur les R-R, les
+    amplitudes puis la tendance, SignalGenerator, apply_trend) avec son propre flux
+    aléatoire : les graines sont dérivées d’une graine racine par SeedSequence.spawn, de
+    sorte que la réalisation k est identique quel que soit le nombre de processus. Les
+    signaux sont écrits directement dans un bloc de mémoire partagée (ou un fichier .npy
+    memory-mappé) au lieu d’être renvoyés un par un par pickle.
+
+    Les réalisations n’ayant pas toutes la même durée (R-R bruités), elles sont ramenées à
+    `length` échantillons : signal tronqué, ou complété par des zéros plus la tendance
+    prolongée (règle de apply_trend).
+
+    Attributs :
+        rr_intervals (np.ndarray) : Intervalles R-R de référence (en s)
+        amplitudes (np.ndarray)   : Amplitudes de référence
+        trend (np.ndarray)        : Tendance lente de référence
+        sampling_rate (float)     : Fréquence d’échantillonnage (Hz)
+        length (int)              : Nombre d’échantillons de chaque réalisation
+        noise (dict)              : Écarts-types du bruit (rr, amplitude, trend)
+        use_templates (bool)      : Battements issus du cache de gabarits de SignalGenerator
+    """
+
+    # Paramètres communs transmis une seule fois à chaque processus (initializer du pool)
+    _worker_params = None
+
+    def __init__(self, rr_intervals, amplitudes, trend, sampling_rate=200, length=None,
+                 rr_noise_std=0.02, amplitude_noise_std=0.08, trend_noise_std=0.02,
+                 use_templates=True):
+        """
+        Args:
+            rr_intervals (np.ndarray)   : Intervalles R-R de référence (en s)
+            amplitudes (np.ndarray)     : Amplitudes correspondantes
+            trend (np.ndarray)          : Tendance lente du signal réel
+            sampling_rate (float)       : Fréquence d’échantillonnage (Hz)
+            length (int|None)           : Longueur des réalisations (par défaut celle de trend)
+            rr_noise_std (float)        : Bruit sur les R-R (comme dans le notebook)
+            amplitude_noise_std (float) : Bruit relatif sur les amplitudes
+            trend_noise_std (float)     : Bruit additif sur la tendance
+            use_templates (bool)        : Utiliser le cache de gabarits (plus rapide)
+        """
+        self.rr_intervals = np.asarray(rr_intervals, dtype=np.float64)
+        self.amplitudes = np.asarray(amplitudes, dtype=np.float64)
+        self.trend = np.asarray(trend, dtype=np.float64)
+        self.sampling_rate = sampling_rate
+        self.length = len(self.trend) if length is None else int(length)
+        self.noise = {"rr": rr_noise_std, "amplitude": amplitude_noise_std,
+                      "trend": trend_noise_std}
+        self.use_templates = use_templates
+
+    def _params(self):
+        return {"rr_intervals": self.rr_intervals, "amplitudes": self.amplitudes,
+                "trend": self.trend, "sampling_rate": self.sampling_rate,
+                "length": self.length, "noise": self.noise,
+                "use_templates": self.use_templates}
+
+    @staticmethod
+    def _realisation(params, seed):
+        """
+        Calcule une réalisation bruitée, ramenée à params["length"] échantillons.
+
+        Args:
+            params (dict)             : Paramètres de l’ensemble (voir _params)
+            seed (np.random.SeedSequence) : Graine propre à la réalisation
+
+        Returns:
+            np.ndarray : Signal final (battements + tendance)
+        """
+        injector = NoiseInjector(seed=seed)
+        noise = params["noise"]
+        rr = injector.add_noise_to_rr(params["rr_intervals"], noise_std=noise["rr"])
+        amplitudes = injector.add_noise_to_amplitudes(params["amplitudes"],
+                                                      noise_std=noise["amplitude"])
+        trend = injector.add_noise_to_trend(params["trend"], noise_std=noise["trend"])
+
+        generator = SignalGenerator(sampling_rate=params["sampling_rate"])
+        flat, _ = generator.synthesize(rr, amplitudes, use_templates=params["use_templates"])
+
+        length = params["length"]
+        signal = np.zeros(length)
+        signal[:min(length, len(flat))] = flat[:length]
+        if len(trend) >= length:
+            signal += trend[:length]
+        elif len(trend):
+            signal += np.pad(trend, (0, length - len(trend)), mode='edge')
+        return signal
+
+    @staticmethod
+    def _init_worker(params):
+        EnsembleGenerator._worker_params = params
+
+    @staticmethod
+    def _fill_rows(indices, seeds, target):
+        """
+        Génère les réalisations `indices` dans le processus courant et les écrit dans la
+        mémoire partagée (ou le fichier memory-mappé) désignée par target.
+        """
+        params = EnsembleGenerator._worker_params
+        kind, location, shape = target
+        if kind == "shm":
+            block = shared_memory.SharedMemory(name=location)
+            output = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+        else:
+            block = None
+            output = np.load(location, mmap_mode='r+')
+
+        try:
+            for index, seed in zip(indices, seeds):
+                output[index] = EnsembleGenerator._realisation(params, seed)
+        finally:
+            del output
+            if block is not None:
+                block.close()
+
+    @staticmethod
+    def spawn_seeds(n_realisations, seed=None):
+        """
+        Graines indépendantes des réalisations, dérivées d’une graine racine.
+
+        Args:
+            n_realisations (int) : Nombre de réalisations
+            seed (int|None)      : Graine racine
+
+        Returns:
+            list : SeedSequence de chaque réalisation (la k-ième ne dépend que de seed et k)
+        """
+        return np.random.SeedSequence(seed).spawn(n_realisations)
+
+    def generate_one(self, index, seed=None):
+        """
+        Calcule une seule réalisation (dans le processus courant).
+
+        Args:
+            index (int)     : Numéro de la réalisation
+            seed (int|None) : Graine racine de l’ensemble
+
+        Returns:
+            np.ndarray : Réalisation `index`, identique à la ligne `index` de generate
+        """
+        return self._realisation(self._params(), self.spawn_seeds(index + 1, seed)[index])
+
+    def generate(self, n_realisations, seed=None, n_jobs=None, block_size=None, out=None):
+        """
+        Génère n_realisations variantes bruitées en parallèle (pool de processus).
+
+        Args:
+            n_realisations (int) : Nombre de réalisations
+            seed (int|None)      : Graine racine (reproductibilité de l’ensemble)
+            n_jobs (int|None)    : Nombre de processus (None : nombre de cœurs, 1 : sans pool)
+            block_size (int|None): Réalisations par tâche (par défaut ~4 tâches par processus)
+            out (str|None)       : Fichier .npy de sortie (memory-map) au lieu de la mémoire partagée
+
+        Returns:
+            np.ndarray : Tableau (n_realisations, length) ; memory-mappé si out est donné
+        """
+        seeds = self.spawn_seeds(n_realisations, seed)
+        shape = (n_realisations, self.length)
+        n_jobs = n_jobs or os.cpu_count() or 1
+
+        if n_jobs == 1:
+            output = np.empty(shape) if out is None else np.lib.format.open_memmap(
+                out, mode='w+', dtype=np.float64, shape=shape)
+            params = self._params()
+            for index, child in enumerate(seeds):
+                output[index] = self._realisation(params, child)
+            return output
+
+        if out is None:
+            block = shared_memory.SharedMemory(create=True, size=max(1, 8 * np.prod(shape)))
+            target = ("shm", block.name, shape)
+        else:
+            block = None
+            np.lib.format.open_memmap(out, mode='w+', dtype=np.float64, shape=shape).flush()
+            target = ("npy", out, shape)
+
+        if block_size is None:
+            block_size = max(1, -(-n_realisations // (4 * n_jobs)))
+
+        try:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=self._init_worker,
+                                     initargs=(self._params(),)) as pool:
+                futures = [pool.submit(self._fill_rows,
+                                       range(b0, min(b0 + block_size, n_realisations)),
+                                       seeds[b0:b0 + block_size], target)
+                           for b0 in range(0, n_realisations, block_size)]
+                for future in futures:
+                    future.result()
+
+            if block is None:
+                return np.load(out, mmap_mode='r+')
+            return np.ndarray(shape, dtype=np.float64, buffer=block.buf).copy()
+        finally:
+            if block is not None:
+                block.close()
+                block.unlink()
+
+
+if __name__ == "__main__":
+    # Benchmark : débit (signaux/s) en fonction du nombre de processus
+    import time
+
+    fs = 200
+    rng = np.random.default_rng(0)
+    rr = np.clip(0.8 + 0.05 * rng.standard_normal(750), 0.4, None)   # ~10 min
+    amplitudes = rng.uniform(15, 25, len(rr))
+    trend = 60 + np.cumsum(rng.standard_normal(int(rr.sum() * fs))) * 0.01
+
+    ensemble = EnsembleGenerator(rr, amplitudes, trend, sampling_rate=fs)
+    n_realisations = 200
+    reference = None
+    for n_jobs in sorted({1, 2, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        signals = ensemble.generate(n_realisations, seed=42, n_jobs=n_jobs)
+        elapsed = time.perf_counter() - start
+        reference = signals if reference is None else reference
+        print(f"n_jobs={n_jobs:>2} : {n_realisations / elapsed:.1f} signaux/s "
+              f"({signals.shape[1]} éch.), identique à n_jobs=1 : "
+              f"{np.array_equal(signals, reference)}")
+
+    single = ensemble.generate_one(17, seed=42)
+    print("Réalisation 17 seule identique :", np.array_equal(single, reference[17]))
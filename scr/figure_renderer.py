@@ -0,0 +1,251 @@
+import gc
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+class FigureRenderer:
+    """
+    Rendu des figures hors écran (Agg) et export en parallèle.
+
+    Les méthodes de tracé des classes d’analyse construisent leurs figures avec l’API objet
+    de matplotlib via new_figure / finish. En mode headless, la figure est une Figure Agg
+    indépendante de pyplot : elle n’est ni affichée ni enregistrée dans l’état global de
+    pyplot, elle est renvoyée à l’appelant ; save_figures l’enregistre puis la libère
+    (artistes effacés, cycles collectés). Cela permet de produire des milliers de figures
+    dans un pool de processus, à mémoire constante, dans un dossier de résultats.
+
+    Attributs :
+        out_dir (str)             : Dossier de résultats
+        dpi (float)               : Résolution des images exportées
+        fmt (str)                 : Format des images ("png", "pdf", "svg", ...)
+        n_jobs (int|None)         : Nombre de processus (None : nombre de cœurs)
+        max_tasks_per_child (int) : Tâches par processus avant son remplacement
+    """
+
+    def __init__(self, out_dir="../results", dpi=100, fmt="png", n_jobs=None,
+                 max_tasks_per_child=100):
+        """
+        Args:
+            out_dir (str)             : Dossier de résultats (créé si besoin)
+            dpi (float)               : Résolution des images exportées
+            fmt (str)                 : Format des images
+            n_jobs (int|None)         : Nombre de processus (None : nombre de cœurs)
+            max_tasks_per_child (int) : Tâches par processus avant recyclage (borne la mémoire)
+        """
+        self.out_dir = out_dir
+        self.dpi = dpi
+        self.fmt = fmt
+        self.n_jobs = n_jobs
+        self.max_tasks_per_child = max_tasks_per_child
+        os.makedirs(self.out_dir, exist_ok=True)
+
+    @staticmethod
+    def new_figure(figsize, headless=False):
+        """
+        Crée une figure et son axe.
+
+        Args:
+            figsize (tuple)  : Taille de la figure (pouces)
+            headless (bool)  : Figure Agg hors pyplot (True) ou figure pyplot (False)
+
+        Returns:
+            Tuple[Figure, Axes] : Figure et axe
+        """
+        if headless:
+            fig = Figure(figsize=figsize)
+            FigureCanvasAgg(fig)
+        else:
+            fig = plt.figure(figsize=figsize)
+        return fig, fig.add_subplot()
+
+    @staticmethod
+    def finish(fig, save_path=None, show=True, headless=False):
+        """
+        Termine une figure : enregistrement éventuel, puis affichage ou fermeture.
+
+        Args:
+            fig (Figure)         : Figure à terminer
+            save_path (str|None) : Fichier de sortie
+            show (bool)          : Afficher la figure (ignoré en mode headless)
+            headless (bool)      : Figure créée par new_figure(headless=True)
+
+        Returns:
+            Figure : La figure (réutilisable, ex. pour savefig)
+        """
+        if save_path:
+            fig.savefig(save_path)
+        if not headless:
+            if show:
+                plt.show()
+            else:
+                plt.close(fig)
+        return fig
+
+    @staticmethod
+    def save_figures(figures, path, dpi=100, fmt="png"):
+        """
+        Enregistre une figure (ou une liste de figures, suffixées _0, _1, ...) puis la libère.
+
+        Args:
+            figures (Figure|list) : Figure(s) à enregistrer
+            path (str)            : Chemin sans extension
+            dpi (float)           : Résolution
+            fmt (str)             : Format
+
+        Returns:
+            list : Chemins des fichiers écrits
+        """
+        if figures is None:
+            return []
+        if isinstance(figures, Figure):
+            figures = [figures]
+            names = [path]
+        else:
+            names = [f"{path}_{i}" for i in range(len(figures))]
+
+        paths = []
+        for fig, name in zip(figures, names):
+            filename = f"{name}.{fmt}"
+            fig.savefig(filename, dpi=dpi, format=fmt)
+            # Libère les artistes ; la figure Agg n’est pas référencée par pyplot
+            fig.clear()
+            plt.close(fig)
+            paths.append(filename)
+
+        # Les figures forment des cycles de références (et gardent le tampon Agg) : sans
+        # collecte explicite, la mémoire monte de ~18 Mo par figure avant d’être récupérée
+        del figures, fig
+        gc.collect()
+        return paths
+
+    @staticmethod
+    def _render_job(name, plot_function, kwargs, out_dir, dpi, fmt):
+        """
+        Appelle une méthode de tracé en mode headless dans un processus de travail, enregistre
+        la ou les figures obtenues puis les libère.
+
+        Returns:
+            list : Chemins des fichiers écrits
+        """
+        figures = plot_function(**kwargs, show=False, headless=True)
+        return FigureRenderer.save_figures(figures, os.path.join(out_dir, name), dpi, fmt)
+
+    @staticmethod
+    def _render_recording(key, filepath, out_dir, dpi, fmt, interval_ms):
+        """
+        Charge un enregistrement, exécute les étapes d’analyse et exporte ses figures
+        (signaux bruts par canal, R-peaks, R-R, enveloppe, tendance).
+
+        Returns:
+            list : Chemins des fichiers écrits
+        """
+        # Imports locaux : les modules d’analyse importent eux-mêmes FigureRenderer
+        from data_loader import DataLoader
+        from peak_detector import PeakDetector
+        from amplitude_analyzer import AmplitudeAnalyzer
+        from trend_extractor import TrendExtractor
+
+        folder = os.path.join(out_dir, key.replace("/", "_"))
+        os.makedirs(folder, exist_ok=True)
+
+        loader = DataLoader(filepath, interval_ms)
+        data = loader.load(engine="c")
+        time = data["Time"].to_numpy()
+        signal = data["HR"].to_numpy()
+        sampling_rate = 1000 / interval_ms
+
+        detector = PeakDetector(signal, time, sampling_rate)
+        detector.detect_r_peaks_manual()
+        analyzer = AmplitudeAnalyzer(signal, time, sampling_rate)
+        extractor = TrendExtractor(signal, time)
+        extractor.extract_rolling_mean()
+
+        paths = []
+        raw = loader.plot(data, show=False, headless=True)
+        channels = [col for col in data.columns if col != "Time"]
+        for channel, fig in zip(channels, raw):
+            paths += FigureRenderer.save_figures(fig, os.path.join(folder, f"raw_{channel}"),
+                                                 dpi, fmt)
+        for name, fig in [("r_peaks", detector.plot_r_peaks(show=False, headless=True)),
+                          ("rr_intervals", detector.plot_rr_intervals(show=False, headless=True)),
+                          ("envelope", analyzer.plot_envelope("minmax", show=False, headless=True)),
+                          ("trend", extractor.plot_trend(show=False, headless=True))]:
+            paths += FigureRenderer.save_figures(fig, os.path.join(folder, name), dpi, fmt)
+        return paths
+
+    def _pool(self):
+        return ProcessPoolExecutor(max_workers=self.n_jobs,
+                                   max_tasks_per_child=self.max_tasks_per_child)
+
+    def render_jobs(self, jobs):
+        """
+        Rend une liste de tracés en parallèle.
+
+        Args:
+            jobs (list) : Tuples (nom, méthode de tracé, kwargs) ; la méthode (ex.
+                          detector.plot_r_peaks, sérialisable) est appelée avec show=False,
+                          headless=True et doit renvoyer une figure ou une liste de figures
+
+        Yields:
+            Tuple[str, list] : nom du tracé et fichiers écrits, dans l’ordre de fin
+        """
+        with self._pool() as pool:
+            futures = {pool.submit(self._render_job, name, function, kwargs, self.out_dir,
+                                   self.dpi, self.fmt): name
+                       for name, function, kwargs in jobs}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def render_recordings(self, recordings, interval_ms=5):
+        """
+        Exporte les figures standard de chaque enregistrement (un processus par enregistrement),
+        dans out_dir/<identifiant>/.
+
+        Args:
+            recordings (dict)   : {identifiant: chemin du fichier}, ex. RecordingDataset.recordings
+            interval_ms (float) : Intervalle d’échantillonnage
+
+        Yields:
+            Tuple[str, list] : identifiant et fichiers écrits, dans l’ordre de fin
+        """
+        with self._pool() as pool:
+            futures = {pool.submit(self._render_recording, key, path, self.out_dir, self.dpi,
+                                   self.fmt, interval_ms): key
+                       for key, path in recordings.items()}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+
+if __name__ == "__main__":
+    # Mémoire constante sur de nombreuses figures, puis export parallèle des enregistrements
+    import resource
+    import tempfile
+    import time
+    import numpy as np
+    from recording_dataset import RecordingDataset
+    from signal_generator import SignalGenerator
+
+    generator = SignalGenerator()
+    generator.tile_signal_from_arrays(np.full(2000, 0.8), np.full(2000, 20.0))
+    generator.apply_trend(np.full(10, 60.0))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        for i in range(300):
+            fig = generator.plot(title=f"Figure {i}", show=False, headless=True)
+            FigureRenderer.save_figures(fig, os.path.join(tmp, "figure"))
+            if i in (9, 99, 299):
+                rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                print(f"{i + 1} figures : {time.perf_counter() - start:.1f} s, "
+                      f"RSS max {rss:.0f} Mo")
+
+        dataset = RecordingDataset("../data")
+        renderer = FigureRenderer(out_dir=tmp)
+        start = time.perf_counter()
+        n_files = sum(len(paths) for _, paths in renderer.render_recordings(dataset.recordings))
+        print(f"{len(dataset)} enregistrements, {n_files} figures en "
+              f"{time.perf_counter() - start:.1f} s ({os.cpu_count()} cœurs)")
@@ -1,5 +1,7 @@
 import numpy as np
 from scipy.ndimage import gaussian_filter1d
+from scipy.fft import rfft, irfft, rfftfreq, next_fast_len
+from scipy.signal import welch
 
 
 class NoiseInjector:
@@ -10,14 +12,25 @@ class NoiseInjector:
     - Tendance lente (modulation globale)
 
     Le bruit est gaussien et lissé pour simuler des variations naturelles non brutales.
+
+    Les variantes *_batch produisent plusieurs réalisations d’un coup (une par ligne) : la
+    réalisation k d’une composante utilise son propre flux, dérivé de la graine par
+    SeedSequence, et ne dépend donc pas des autres réalisations demandées.
     """
 
+    # Numéro de composante utilisé dans la dérivation des flux des réalisations
+    COMPONENTS = {"rr": 0, "amplitude": 1, "trend": 2}
+
     def __init__(self, seed=None):
         """
         Args:
-            seed (int ou None) : Graine pour rendre le bruit reproductible
+            seed (int, SeedSequence ou None) : Graine pour rendre le bruit reproductible
         """
         self.rng = np.random.default_rng(seed)
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
 
     def _smoothed_noise(self, length, std=0.02, smoothing_sigma=3):
         """
@@ -34,6 +47,157 @@ class NoiseInjector:
         noise = self.rng.normal(0, std, size=length)
         return gaussian_filter1d(noise, sigma=smoothing_sigma)
 
+    def _realisation_rngs(self, component, realisations):
+        """
+        Générateurs aléatoires des réalisations demandées pour une composante.
+
+        Args:
+            component (str)         : "rr", "amplitude" ou "trend"
+            realisations (int|list) : Nombre de réalisations (0..n-1) ou liste d’indices
+
+        Returns:
+            list : Un np.random.Generator par réalisation
+        """
+        if np.isscalar(realisations):
+            realisations = range(int(realisations))
+        root = self.seed_sequence
+        key = root.spawn_key + (self.COMPONENTS[component],)
+        return [np.random.default_rng(np.random.SeedSequence(
+            root.entropy, spawn_key=key + (int(k),))) for k in realisations]
+
+    def _smoothed_noise_batch(self, length, realisations, component, std=0.02,
+                              smoothing_sigma=3):
+        """
+        Génère une matrice de bruits gaussiens lissés, une réalisation par ligne.
+
+        Args:
+            length (int)            : Taille de chaque vecteur de bruit
+            realisations (int|list) : Nombre de réalisations ou liste d’indices
+            component (str)         : Composante bruitée ("rr", "amplitude", "trend")
+            std (float)             : Écart-type du bruit
+            smoothing_sigma (int)   : Lissage par filtre gaussien
+
+        Returns:
+            np.ndarray : Bruits lissés, tableau (n_realisations, length)
+        """
+        rngs = self._realisation_rngs(component, realisations)
+        noise = np.empty((len(rngs), length))
+        for row, rng in zip(noise, rngs):
+            rng.standard_normal(out=row)
+        noise *= std
+        # Un seul appel de filtre pour toutes les lignes
+        return gaussian_filter1d(noise, sigma=smoothing_sigma, axis=-1)
+
+    def _target_spectrum(self, freqs, spectrum, smoothing_sigma, exponent, band, reference,
+                         sampling_rate):
+        """
+        Gain en amplitude (racine de la DSP cible) aux fréquences freqs (en Hz).
+
+        Returns:
+            np.ndarray : Gain non normalisé de chaque fréquence
+        """
+        if spectrum == "gaussian":
+            # Réponse fréquentielle du filtre gaussien de gaussian_filter1d (σ en échantillons)
+            sigma_sec = smoothing_sigma / sampling_rate
+            return np.exp(-2 * (np.pi * sigma_sec * freqs) ** 2)
+
+        if spectrum == "pink":
+            gain = np.zeros_like(freqs)
+            gain[1:] = freqs[1:] ** (-exponent / 2)
+            return gain
+
+        if spectrum == "band":
+            if band is None:
+                raise ValueError("Le spectre 'band' nécessite band=(f_min, f_max).")
+            return ((freqs >= band[0]) & (freqs <= band[1])).astype(np.float64)
+
+        if spectrum == "psd":
+            if reference is None:
+                raise ValueError("Le spectre 'psd' nécessite un signal de référence.")
+            reference = np.asarray(reference, dtype=np.float64)
+            ref_freqs, ref_psd = welch(reference, fs=sampling_rate, detrend='linear',
+                                       nperseg=min(len(reference), 2 ** 16))
+            gain = np.sqrt(np.interp(freqs, ref_freqs, ref_psd))
+            gain[0] = 0.0
+            return gain
+
+        raise ValueError(f"Spectre inconnu : {spectrum}")
+
+    def _spectral_noise(self, length, std=0.05, spectrum="gaussian", smoothing_sigma=10,
+                        exponent=1.0, band=None, reference=None, sampling_rate=1.0):
+        """
+        Génère un bruit de spectre donné directement dans le domaine fréquentiel (FFT) :
+        coût O(n log n) quel que soit le lissage.
+
+        Un bruit blanc est filtré par le gain spectral cible, sur une longueur rallongée
+        (4σ pour "gaussian", doublée sinon) pour éviter le raccord circulaire.
+        Avec "gaussian", l’écart-type std est celui du bruit blanc avant lissage, comme
+        _smoothed_noise (même résultat que gaussian_filter1d loin des bords) ; pour les
+        autres spectres, std est l’écart-type du bruit produit.
+
+        Args:
+            length (int)            : Taille du vecteur de bruit
+            std (float)             : Écart-type (voir ci-dessus)
+            spectrum (str)          : "gaussian", "pink" (1/f^exponent), "band" ou "psd"
+            smoothing_sigma (float) : Lissage en échantillons ("gaussian")
+            exponent (float)        : Exposant de la DSP en 1/f ("pink")
+            band (tuple)            : Bande (f_min, f_max) conservée ("band"), en Hz
+            reference (np.ndarray)  : Signal dont la DSP est reproduite ("psd"), ex. une
+                                      tendance de TrendExtractor
+            sampling_rate (float)   : Fréquence d’échantillonnage (Hz) des fréquences
+
+        Returns:
+            np.ndarray : Bruit de longueur length
+        """
+        if spectrum == "gaussian":
+            n_fft = next_fast_len(length + int(np.ceil(4 * smoothing_sigma)), real=True)
+        else:
+            n_fft = next_fast_len(2 * length, real=True)
+
+        freqs = rfftfreq(n_fft, d=1 / sampling_rate)
+        gain = self._target_spectrum(freqs, spectrum, smoothing_sigma, exponent, band,
+                                     reference, sampling_rate)
+
+        if spectrum != "gaussian":
+            # Normalisation : variance de sortie = somme de |gain|² sur le spectre complet / n
+            weights = np.full(len(freqs), 2.0)
+            weights[0] = 1.0
+            if n_fft % 2 == 0:
+                weights[-1] = 1.0
+            power = np.sum(weights * gain ** 2) / n_fft
+            if power == 0:
+                raise ValueError("Le spectre cible est nul sur toutes les fréquences.")
+            gain = gain / np.sqrt(power)
+
+        white = self.rng.normal(0, std, size=n_fft)
+        return irfft(rfft(white) * gain, n=n_fft)[:length]
+
+    def add_spectral_noise_to_trend(self, trend, noise_std=0.05, spectrum="gaussian",
+                                    smoothing_sigma=10, exponent=1.0, band=None,
+                                    reference=None, sampling_rate=1.0):
+        """
+        Ajoute à la tendance un bruit de spectre donné (voir _spectral_noise), adapté aux
+        dérives très lentes (σ de plusieurs milliers d’échantillons) sur de longs signaux.
+
+        Args:
+            trend (np.ndarray)      : Vecteur de tendance
+            noise_std (float)       : Écart-type du bruit
+            spectrum (str)          : "gaussian", "pink", "band" ou "psd"
+            smoothing_sigma (float) : Lissage en échantillons ("gaussian")
+            exponent (float)        : Exposant de la DSP en 1/f ("pink")
+            band (tuple)            : Bande (f_min, f_max) en Hz ("band")
+            reference (np.ndarray)  : Tendance réelle dont la DSP est reproduite ("psd")
+            sampling_rate (float)   : Fréquence d’échantillonnage (Hz)
+
+        Returns:
+            np.ndarray : Tendance bruitée
+        """
+        noise = self._spectral_noise(len(trend), std=noise_std, spectrum=spectrum,
+                                     smoothing_sigma=smoothing_sigma, exponent=exponent,
+                                     band=band, reference=reference,
+                                     sampling_rate=sampling_rate)
+        return trend + noise
+
     def add_noise_to_rr(self, rr_intervals, noise_std=0.02, smoothing_sigma=3):
         """
         Ajoute un bruit réaliste aux intervalles R-R pour perturber les largeurs des battements.
@@ -84,3 +248,98 @@ class NoiseInjector:
         noise = self._smoothed_noise(
             len(trend), std=noise_std, smoothing_sigma=smoothing_sigma)
         return trend + noise
+
+    def add_noise_to_rr_batch(self, rr_intervals, realisations, noise_std=0.02, smoothing_sigma=3):
+        """
+        Version multi-réalisations de add_noise_to_rr.
+
+        Args:
+            rr_intervals (np.ndarray) : Durées des battements (en secondes)
+            realisations (int|list)   : Nombre de réalisations ou liste d’indices
+            noise_std (float)         : Intensité du bruit
+            smoothing_sigma (int)     : Lissage du bruit
+
+        Returns:
+            np.ndarray : Intervalles bruités, tableau (n_realisations, len(rr_intervals))
+        """
+        noise = self._smoothed_noise_batch(len(rr_intervals), realisations, "rr",
+                                           std=noise_std, smoothing_sigma=smoothing_sigma)
+        return np.clip(rr_intervals + noise, a_min=0.3, a_max=None)
+
+    def add_noise_to_amplitudes_batch(self, amplitudes, realisations, noise_std=0.1,
+                                      smoothing_sigma=3):
+        """
+        Version multi-réalisations de add_noise_to_amplitudes.
+
+        Args:
+            amplitudes (np.ndarray) : Amplitudes extraites (via enveloppe)
+            realisations (int|list) : Nombre de réalisations ou liste d’indices
+            noise_std (float)       : Écart-type du bruit relatif
+            smoothing_sigma (int)   : Lissage du bruit
+
+        Returns:
+            np.ndarray : Amplitudes perturbées, tableau (n_realisations, len(amplitudes))
+        """
+        noise = self._smoothed_noise_batch(len(amplitudes), realisations, "amplitude",
+                                           std=noise_std, smoothing_sigma=smoothing_sigma)
+        return np.clip(amplitudes * (1 + noise), a_min=0.1, a_max=None)
+
+    def add_noise_to_trend_batch(self, trend, realisations, noise_std=0.05, smoothing_sigma=10):
+        """
+        Version multi-réalisations de add_noise_to_trend.
+
+        Args:
+            trend (np.ndarray)      : Vecteur de tendance
+            realisations (int|list) : Nombre de réalisations ou liste d’indices
+            noise_std (float)       : Écart-type du bruit additif
+            smoothing_sigma (int)   : Degré de lissage
+
+        Returns:
+            np.ndarray : Tendances bruitées, tableau (n_realisations, len(trend))
+        """
+        noise = self._smoothed_noise_batch(len(trend), realisations, "trend",
+                                           std=noise_std, smoothing_sigma=smoothing_sigma)
+        return trend + noise
+
+
+if __name__ == "__main__":
+    # Benchmark : lissage gaussien direct vs synthèse spectrale, pour des σ croissants
+    import time
+
+    n = 2_000_000
+    for sigma in [10, 1000, 5000]:
+        direct = NoiseInjector(seed=0)
+        start = time.perf_counter()
+        direct._smoothed_noise(n, std=0.05, smoothing_sigma=sigma)
+        t_direct = time.perf_counter() - start
+
+        spectral = NoiseInjector(seed=0)
+        start = time.perf_counter()
+        noise = spectral._spectral_noise(n, std=0.05, smoothing_sigma=sigma)
+        t_spectral = time.perf_counter() - start
+
+        expected_std = 0.05 / np.sqrt(2 * np.sqrt(np.pi) * sigma)
+        print(f"σ={sigma:>5} : gaussian_filter1d {t_direct:.2f} s, spectral {t_spectral:.2f} s, "
+              f"écart-type {noise.std():.2e} (théorique {expected_std:.2e})")
+
+    # Équivalence avec gaussian_filter1d sur le même bruit blanc (loin des bords)
+    sigma, length = 50, 100_000
+    n_fft = next_fast_len(length + 4 * sigma, real=True)
+    white = np.random.default_rng(1).normal(0, 1, n_fft)
+    freqs = rfftfreq(n_fft)
+    spectral = irfft(rfft(white) * np.exp(-2 * (np.pi * sigma * freqs) ** 2), n=n_fft)
+    filtered = gaussian_filter1d(white, sigma=sigma)
+    interior = slice(8 * sigma, length - 8 * sigma)
+    print("Écart max avec gaussian_filter1d (intérieur) :",
+          np.abs(spectral[interior] - filtered[interior]).max())
+
+    # DSP d’une tendance de référence reproduite
+    rng = np.random.default_rng(2)
+    reference = gaussian_filter1d(np.cumsum(rng.standard_normal(400_000)), 2000)
+    matched = NoiseInjector(seed=3)._spectral_noise(400_000, std=1.0, spectrum="psd",
+                                                    reference=reference, sampling_rate=200)
+    f_ref, p_ref = welch(reference, fs=200, detrend='linear', nperseg=2 ** 16)
+    f_out, p_out = welch(matched, fs=200, detrend='linear', nperseg=2 ** 16)
+    low = slice(1, 20)
+    print("Forme de DSP (corrélation log sur les basses fréquences) :",
+          np.corrcoef(np.log(p_ref[low]), np.log(p_out[low]))[0, 1])
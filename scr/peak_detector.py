@@ -1,6 +1,10 @@
-from scipy.signal import find_peaks
+from scipy.signal import find_peaks, peak_prominences
+from scipy.integrate import trapezoid
 import numpy as np
-import matplotlib.pyplot as plt
+import pandas as pd
+
+from plot_downsampler import PlotDownsampler
+from figure_renderer import FigureRenderer
 
 
 class PeakDetector:
@@ -51,7 +55,14 @@ class PeakDetector:
         Returns:
             dict : Moyenne, écart-type, fréquence cardiaque moyenne, nombre de battements
         """
-        if self.rr_intervals is None or len(self.rr_intervals) == 0:
+        return self._rr_stats(self.rr_intervals)
+
+    @staticmethod
+    def _rr_stats(rr_intervals):
+        """
+        Statistiques de base sur une série d’intervalles R-R (voir get_rr_stats).
+        """
+        if rr_intervals is None or len(rr_intervals) == 0:
             return {
                 "mean_rr_interval_s": np.nan,
                 "std_rr_interval_s": np.nan,
@@ -60,19 +71,178 @@ class PeakDetector:
             }
 
         return {
-            "mean_rr_interval_s": self.rr_intervals.mean(),
-            "std_rr_interval_s": self.rr_intervals.std(),
-            "num_beats": len(self.rr_intervals) + 1,  # n RR => n+1 battements
-            "heart_rate_bpm": 60 / self.rr_intervals.mean()
+            "mean_rr_interval_s": rr_intervals.mean(),
+            "std_rr_interval_s": rr_intervals.std(),
+            "num_beats": len(rr_intervals) + 1,  # n RR => n+1 battements
+            "heart_rate_bpm": 60 / rr_intervals.mean()
         }
 
-    def plot_r_peaks(self, zoom_start=None, zoom_end=None):
+    def sweep_r_peaks(self, distances_sec, prominences):
+        """
+        Évalue une grille de réglages (distance_sec, prominence) de detect_r_peaks_manual.
+
+        Les maxima locaux et leurs proéminences sont calculés une seule fois ; pour chaque
+        distance, la sélection par distance de find_peaks est appliquée (une fois par valeur
+        distincte), puis tous les seuils de proéminence sont filtrés en une opération
+        vectorisée. Les pics obtenus sont identiques à ceux de detect_r_peaks_manual
+        (find_peaks filtre la distance avant la proéminence, et la proéminence d’un pic
+        ne dépend pas des autres pics). L’état de l’objet (rpeaks, rr_intervals) n’est pas modifié.
+
+        Args:
+            distances_sec (list) : Valeurs de distance_sec à tester (en s)
+            prominences (list)   : Valeurs de prominence à tester
+
+        Returns:
+            list[dict] : Un dictionnaire par réglage : distance_sec, prominence, rpeaks,
+                         rr_intervals et les statistiques de get_rr_stats
+        """
+        candidates, _ = find_peaks(self.signal)
+        candidate_prominences = peak_prominences(self.signal, candidates)[0]
+        thresholds = np.asarray(prominences, dtype=np.float64)
+
+        results = []
+        for distance_sec in distances_sec:
+            distance_samples = int(distance_sec * self.sampling_rate)
+            kept, _ = find_peaks(self.signal, distance=distance_samples)
+            kept_prominences = candidate_prominences[
+                np.searchsorted(candidates, kept)]
+
+            # Une ligne par seuil de proéminence
+            masks = kept_prominences[np.newaxis, :] >= thresholds[:, np.newaxis]
+            for prominence, mask in zip(prominences, masks):
+                rpeaks = kept[mask]
+                rr_intervals = np.diff(rpeaks) / self.sampling_rate
+                results.append({
+                    "distance_sec": distance_sec,
+                    "prominence": prominence,
+                    "rpeaks": rpeaks,
+                    "rr_intervals": rr_intervals,
+                    **self._rr_stats(rr_intervals)
+                })
+        return results
+
+    def compute_windowed_hrv(self, window_sec=300, step_sec=30, n_freqs=64,
+                             lf_band=(0.04, 0.15), hf_band=(0.15, 0.4)):
+        """
+        Calcule des métriques HRV sur fenêtres glissantes, en une passe vectorisée.
+
+        Chaque intervalle R-R est daté par le R-peak qui le termine. Les sommes par fenêtre
+        sont obtenues par différences de sommes cumulées (aucune boucle par fenêtre) :
+        SDNN (écart-type des R-R), RMSSD, pNN50 et fréquence cardiaque moyenne. LF et HF
+        sont les puissances de Lomb–Scargle (série R-R non uniformément échantillonnée,
+        centrée par fenêtre, normalisée en 2P/n) intégrées sur chaque bande ; les sommes
+        trigonométriques du périodogramme sont elles aussi cumulées sur toute la série.
+
+        Args:
+            window_sec (float) : Durée des fenêtres (en s)
+            step_sec (float)   : Pas entre deux fenêtres (en s)
+            n_freqs (int)      : Nombre de fréquences de la grille de Lomb–Scargle
+            lf_band (tuple)    : Bande LF en Hz
+            hf_band (tuple)    : Bande HF en Hz
+
+        Returns:
+            pd.DataFrame : Une ligne par fenêtre (start_s, end_s, num_rr, mean_rr_interval_s,
+                           sdnn_s, rmssd_s, pnn50, heart_rate_bpm, lf_power, hf_power, lf_hf_ratio)
+        """
+        if self.rpeaks is None or len(self.rpeaks) < 3:
+            raise ValueError(
+                "⚠️ Utilisez .detect_r_peaks_manual() avant le calcul HRV (au moins 3 R-peaks).")
+
+        rr = np.diff(self.rpeaks) / self.sampling_rate
+        t = self.rpeaks[1:] / self.sampling_rate
+
+        starts = np.arange(t[0], t[-1] - window_sec + step_sec, step_sec)
+        if len(starts) == 0:
+            starts = np.array([t[0]])
+        i0 = np.searchsorted(t, starts, side='left')
+        i1 = np.searchsorted(t, starts + window_sec, side='left')
+        n = (i1 - i0).astype(np.float64)
+
+        def window_sums(values):
+            # Sommes par fenêtre via sommes cumulées préfixées d’un zéro
+            cumulative = np.concatenate(
+                (np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)))
+            return cumulative[i1] - cumulative[i0]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Domaine temporel (centrage global pour limiter les erreurs d’arrondi)
+            offset = rr.mean()
+            centered = rr - offset
+            mean_rr = offset + window_sums(centered) / n
+            sdnn = np.sqrt(np.maximum(
+                window_sums(centered ** 2) / n - (mean_rr - offset) ** 2, 0))
+
+            # Différences successives : couple (k, k+1) compté si k+1 est dans la fenêtre
+            diffs = np.concatenate((np.diff(rr), [0.0]))
+            n_diffs = np.maximum(n - 1, 0)
+            rmssd = np.sqrt(
+                (window_sums(diffs ** 2) - diffs[np.maximum(i1 - 1, 0)] ** 2) / n_diffs)
+            nn50 = (np.abs(diffs) > 0.05).astype(np.float64)
+            pnn50 = (window_sums(nn50) - nn50[np.maximum(i1 - 1, 0)]) / n_diffs
+
+            # Lomb–Scargle par fenêtre à partir de sommes cumulées (fenêtres x fréquences),
+            # par blocs de fréquences pour borner la mémoire (battements x bloc)
+            freqs = np.linspace(lf_band[0], hf_band[1], n_freqs)
+            local_mean = (mean_rr - offset)[:, np.newaxis]
+            power = np.empty((len(starts), n_freqs))
+            for f0 in range(0, n_freqs, 16):
+                phase = 2 * np.pi * t[:, np.newaxis] * freqs[np.newaxis, f0:f0 + 16]
+                cos, sin = np.cos(phase), np.sin(phase)
+                sum_c, sum_s = window_sums(cos), window_sums(sin)
+                sum_c2 = window_sums(np.cos(2 * phase))
+                sum_s2 = window_sums(np.sin(2 * phase))
+                sum_yc = window_sums(centered[:, np.newaxis] * cos) - local_mean * sum_c
+                sum_ys = window_sums(centered[:, np.newaxis] * sin) - local_mean * sum_s
+
+                # Décalage tau : tan(2ωτ) = Σ sin 2ωt / Σ cos 2ωt
+                two_tau = np.arctan2(sum_s2, sum_c2)
+                cos_tau, sin_tau = np.cos(two_tau / 2), np.sin(two_tau / 2)
+                yc = cos_tau * sum_yc + sin_tau * sum_ys
+                ys = cos_tau * sum_ys - sin_tau * sum_yc
+                resultant = np.hypot(sum_c2, sum_s2)
+                cc = (n[:, np.newaxis] + resultant) / 2
+                ss = (n[:, np.newaxis] - resultant) / 2
+                power[:, f0:f0 + 16] = (yc ** 2 / cc + ys ** 2 / ss) / n[:, np.newaxis]
+
+            def band_power(band):
+                mask = (freqs >= band[0]) & (freqs <= band[1])
+                return trapezoid(power[:, mask], freqs[mask], axis=1)
+
+            lf_power, hf_power = band_power(lf_band), band_power(hf_band)
+
+            table = pd.DataFrame({
+                "start_s": starts,
+                "end_s": starts + window_sec,
+                "num_rr": (i1 - i0),
+                "mean_rr_interval_s": mean_rr,
+                "sdnn_s": sdnn,
+                "rmssd_s": rmssd,
+                "pnn50": pnn50,
+                "heart_rate_bpm": 60 / mean_rr,
+                "lf_power": lf_power,
+                "hf_power": hf_power,
+                "lf_hf_ratio": lf_power / hf_power,
+            })
+
+        # Fenêtres trop peu peuplées : métriques non définies
+        table.loc[table["num_rr"] < 3, table.columns[3:]] = np.nan
+        return table
+
+    def plot_r_peaks(self, zoom_start=None, zoom_end=None, downsample=True, show=True,
+                     headless=False):
         """
         Affiche le signal brut avec les R-peaks détectés (entier ou sur une plage zoomée).
 
         Args:
             zoom_start (float) : Temps de début pour le zoom (en s)
             zoom_end (float)   : Temps de fin pour le zoom (en s)
+            downsample (bool)  : Réduire le signal à la résolution de la figure (les R-peaks
+                                 restent tous tracés)
+            show (bool)        : Afficher la figure
+            headless (bool)    : Figure Agg hors pyplot, renvoyée sans affichage (FigureRenderer)
+
+        Returns:
+            Figure : Figure créée
         """
         t = self.time
         s = self.signal
@@ -88,34 +258,42 @@ class PeakDetector:
         else:
             rpeaks = self.rpeaks
 
-        plt.figure(figsize=(14, 4))
-        plt.plot(t, s, label="Signal brut", color='lightblue')
-        plt.scatter(self.time[rpeaks], self.signal[rpeaks],
-                    color='red', label='R-peaks')
-        plt.title("Détection des R-peaks (manuel SciPy)")
-        plt.xlabel("Temps (s)")
-        plt.ylabel("Amplitude")
-        plt.grid(True)
-        plt.legend()
-        plt.tight_layout()
-        plt.show()
+        fig, ax = FigureRenderer.new_figure((14, 4), headless)
+        reducer = PlotDownsampler(fig, enabled=downsample)
+        ax.plot(*reducer.reduce(t, s), label="Signal brut", color='lightblue')
+        ax.scatter(self.time[rpeaks], self.signal[rpeaks],
+                   color='red', label='R-peaks')
+        ax.set_title("Détection des R-peaks (manuel SciPy)")
+        ax.set_xlabel("Temps (s)")
+        ax.set_ylabel("Amplitude")
+        ax.grid(True)
+        ax.legend()
+        fig.tight_layout()
+        return FigureRenderer.finish(fig, show=show, headless=headless)
 
-    def plot_rr_intervals(self):
+    def plot_rr_intervals(self, show=True, headless=False):
         """
         Affiche la série temporelle des intervalles R-R détectés (durée entre battements).
+
+        Args:
+            show (bool)     : Afficher la figure
+            headless (bool) : Figure Agg hors pyplot, renvoyée sans affichage (FigureRenderer)
+
+        Returns:
+            Figure | None : Figure créée (None si les R-R ne sont pas disponibles)
         """
         if self.rr_intervals is None:
             print("RR intervals non disponibles.")
-            return
-
-        plt.figure(figsize=(12, 3))
-        plt.plot(self.rr_intervals, marker='o')
-        plt.title("Intervalles R-R (durée entre battements)")
-        plt.xlabel("Index")
-        plt.ylabel("Durée (s)")
-        plt.grid(True)
-        plt.tight_layout()
-        plt.show()
+            return None
+
+        fig, ax = FigureRenderer.new_figure((12, 3), headless)
+        ax.plot(self.rr_intervals, marker='o')
+        ax.set_title("Intervalles R-R (durée entre battements)")
+        ax.set_xlabel("Index")
+        ax.set_ylabel("Durée (s)")
+        ax.grid(True)
+        fig.tight_layout()
+        return FigureRenderer.finish(fig, show=show, headless=headless)
 
     def get_rpeaks_and_intervals(self):
         """
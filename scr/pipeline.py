@@ -0,0 +1,327 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+from data_loader import DataLoader
+from peak_detector import PeakDetector
+from amplitude_analyzer import AmplitudeAnalyzer
+from trend_extractor import TrendExtractor
+from signal_generator import SignalGenerator
+from noise_injector import NoiseInjector
+
+
+class Pipeline:
+    """
+    Pipeline complet du notebook (chargement → R-peaks → amplitude / tendance → synthèse →
+    bruit → synthèse bruitée) déclaré comme un graphe d’étapes paramétrées, avec mémoïsation.
+
+    La sortie de chaque étape est mise en cache sous une clé calculée à partir du nom de
+    l’étape, de ses paramètres et des clés de ses entrées (pour le chargement : chemin,
+    taille et date de modification du fichier). Modifier un paramètre ne recalcule donc que
+    l’étape concernée et celles qui en dépendent (ex. rr_noise_std → noise, noisy_synthesis).
+    Le cache est en mémoire (LRU, max_entries sorties) et, optionnellement, sur disque
+    (cache_dir, un fichier pickle par sortie). Les sorties sont partagées entre les runs
+    et les étapes qui en dépendent : leurs tableaux sont en lecture seule (les copier
+    avant de les modifier).
+
+    Les étapes indépendantes (ex. amplitude et trend) s’exécutent en parallèle dans un pool
+    de threads : les sorties restent en mémoire partagée et NumPy/SciPy libèrent le GIL
+    pendant les calculs lourds.
+
+    Attributs :
+        params (dict)      : Paramètres de chaque étape {étape: {paramètre: valeur}}
+        max_entries (int)  : Nombre maximal de sorties gardées en mémoire
+        cache_dir (str)    : Dossier du cache disque (None : pas de cache disque)
+        n_jobs (int)       : Nombre maximal d’étapes exécutées simultanément
+        last_run (dict)    : Pour chaque étape du dernier run : origine ("memory", "disk",
+                             "computed") et durée (s)
+    """
+
+    # Étapes : (méthode, dépendances, paramètres par défaut) ; valeurs du notebook (analyse
+    # sur 0–250 s ; start_time / end_time à None pour l’enregistrement entier)
+    STAGES = OrderedDict([
+        ("load", ("_run_load", (), {"filepath": "../data/data1/Adrenaline.txt",
+                                    "interval_ms": 5, "channel": "HR",
+                                    "start_time": 0, "end_time": 250})),
+        ("peaks", ("_run_peaks", ("load",), {"distance_sec": 0.4, "prominence": 3})),
+        ("amplitude", ("_run_amplitude", ("load", "peaks"), {"method": "minmax",
+                                                              "window_size": 200})),
+        ("trend", ("_run_trend", ("load",), {"method": "combined", "window_size": 1001,
+                                              "smooth_factor": 1e7, "bin_size": 10,
+                                              "knot_spacing": 5.0})),
+        ("synthesis", ("_run_synthesis", ("load", "peaks", "amplitude", "trend"),
+                       {"use_templates": False})),
+        ("noise", ("_run_noise", ("peaks", "amplitude", "trend"),
+                   {"seed": 42, "rr_noise_std": 0.02, "amplitude_noise_std": 0.08,
+                    "trend_noise_std": 0.02})),
+        ("noisy_synthesis", ("_run_synthesis_noisy", ("load", "noise"),
+                             {"use_templates": False})),
+    ])
+
+    def __init__(self, filepath=None, params=None, max_entries=32, cache_dir=None, n_jobs=4):
+        """
+        Args:
+            filepath (str|None)  : Fichier à traiter (raccourci pour params["load"]["filepath"])
+            params (dict|None)   : Paramètres modifiés {étape: {paramètre: valeur}}
+            max_entries (int)    : Taille du cache mémoire (nombre de sorties)
+            cache_dir (str|None) : Dossier du cache disque (créé si besoin)
+            n_jobs (int)         : Nombre maximal d’étapes simultanées
+        """
+        self.params = {name: dict(defaults) for name, (_, _, defaults) in self.STAGES.items()}
+        if filepath is not None:
+            self.params["load"]["filepath"] = filepath
+        for stage, values in (params or {}).items():
+            self.set_params(stage, **values)
+
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.n_jobs = n_jobs
+        self.last_run = {}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def set_params(self, stage, **values):
+        """
+        Modifie des paramètres d’une étape (les sorties en cache restent valables pour les
+        autres combinaisons de paramètres).
+
+        Args:
+            stage (str) : Nom de l’étape
+            **values    : Paramètres à modifier
+        """
+        if stage not in self.STAGES:
+            raise KeyError(f"Étape inconnue : {stage}")
+        unknown = set(values) - set(self.STAGES[stage][2])
+        if unknown:
+            raise KeyError(f"Paramètres inconnus pour {stage} : {sorted(unknown)}")
+        self.params[stage].update(values)
+
+    # ------------------------------------------------------------------ étapes
+
+    @staticmethod
+    def _run_load(params):
+        loader = DataLoader(params["filepath"], params["interval_ms"])
+        data = loader.load(engine="c")
+        if params["start_time"] is not None and params["end_time"] is not None:
+            data = loader.crop_time_range(params["start_time"], params["end_time"])
+        return {"time": data["Time"].to_numpy(), "signal": data[params["channel"]].to_numpy(),
+                "sampling_rate": 1000 / params["interval_ms"]}
+
+    @staticmethod
+    def _run_peaks(params, load):
+        detector = PeakDetector(load["signal"], load["time"], load["sampling_rate"])
+        rpeaks, rr_intervals = detector.detect_r_peaks_manual(
+            distance_sec=params["distance_sec"], prominence=params["prominence"])
+        return {"rpeaks": rpeaks, "rr_intervals": rr_intervals,
+                "stats": detector.get_rr_stats()}
+
+    @staticmethod
+    def _run_amplitude(params, load, peaks):
+        analyzer = AmplitudeAnalyzer(load["signal"], load["time"], load["sampling_rate"])
+        return analyzer.compute_beat_amplitudes(peaks["rpeaks"], method=params["method"],
+                                                window_size=params["window_size"])
+
+    @staticmethod
+    def _run_trend(params, load):
+        extractor = TrendExtractor(load["signal"], load["time"])
+        if params["method"] == "rolling":
+            return extractor.extract_rolling_mean(window_size=params["window_size"])
+        if params["method"] == "spline":
+            return extractor.extract_spline(smooth_factor=params["smooth_factor"])
+        if params["method"] == "combined":
+            return extractor.extract_combined(rolling_window=params["window_size"],
+                                              smooth_factor=params["smooth_factor"])
+        if params["method"] == "binned":
+            return extractor.extract_spline_binned(bin_size=params["bin_size"],
+                                                   knot_spacing=params["knot_spacing"])
+        raise ValueError(f"Méthode de tendance inconnue : {params['method']}")
+
+    @staticmethod
+    def _synthesize(sampling_rate, rr_intervals, amplitudes, trend, use_templates):
+        generator = SignalGenerator(sampling_rate=sampling_rate)
+        generator.tile_signal_from_arrays(rr_intervals, amplitudes, use_templates=use_templates)
+        return {"time": generator.time, "signal_flat": generator.signal_flat,
+                "signal": generator.apply_trend(trend),
+                "r_peak_positions": generator.r_peak_positions}
+
+    @staticmethod
+    def _run_synthesis(params, load, peaks, amplitude, trend):
+        return Pipeline._synthesize(load["sampling_rate"], peaks["rr_intervals"], amplitude,
+                                    trend, params["use_templates"])
+
+    @staticmethod
+    def _run_noise(params, peaks, amplitude, trend):
+        injector = NoiseInjector(seed=params["seed"])
+        return {
+            "rr_intervals": injector.add_noise_to_rr(peaks["rr_intervals"],
+                                                     noise_std=params["rr_noise_std"]),
+            "amplitudes": injector.add_noise_to_amplitudes(
+                amplitude, noise_std=params["amplitude_noise_std"]),
+            "trend": injector.add_noise_to_trend(trend, noise_std=params["trend_noise_std"]),
+        }
+
+    @staticmethod
+    def _run_synthesis_noisy(params, load, noise):
+        return Pipeline._synthesize(load["sampling_rate"], noise["rr_intervals"],
+                                    noise["amplitudes"], noise["trend"], params["use_templates"])
+
+    # ------------------------------------------------------------------ cache
+
+    def _stage_key(self, stage, keys):
+        """Clé d’une étape : nom, paramètres et clés des entrées (état du fichier pour load)."""
+        _, depends, _ = self.STAGES[stage]
+        identity = [stage, self.params[stage], [keys[dep] for dep in depends]]
+        if stage == "load":
+            stat = os.stat(self.params["load"]["filepath"])
+            identity.append([os.path.abspath(self.params["load"]["filepath"]),
+                             stat.st_size, stat.st_mtime_ns])
+        payload = json.dumps(identity, sort_keys=True, default=repr)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _required(self, targets):
+        """Étapes nécessaires pour obtenir targets, dans l’ordre de déclaration."""
+        needed = set()
+        stack = list(targets)
+        while stack:
+            stage = stack.pop()
+            if stage not in self.STAGES:
+                raise KeyError(f"Étape inconnue : {stage}")
+            if stage not in needed:
+                needed.add(stage)
+                stack.extend(self.STAGES[stage][1])
+        return [stage for stage in self.STAGES if stage in needed]
+
+    def _disk_path(self, stage, key):
+        return os.path.join(self.cache_dir, f"{stage}-{key}.pkl")
+
+    def _lookup(self, stage, key):
+        """Cherche une sortie en mémoire puis sur disque. Returns: (origine, sortie) ou None."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return "memory", self._memory[key]
+
+        if self.cache_dir is not None and os.path.exists(self._disk_path(stage, key)):
+            with open(self._disk_path(stage, key), "rb") as f:
+                output = pickle.load(f)
+            self._remember(key, output)
+            return "disk", output
+        return None
+
+    @staticmethod
+    def _freeze(output):
+        """Passe en lecture seule les tableaux d’une sortie (dict, list, tuple imbriqués)."""
+        if isinstance(output, np.ndarray):
+            output.flags.writeable = False
+        elif isinstance(output, dict):
+            for value in output.values():
+                Pipeline._freeze(value)
+        elif isinstance(output, (list, tuple)):
+            for value in output:
+                Pipeline._freeze(value)
+        return output
+
+    def _remember(self, key, output):
+        self._freeze(output)
+        with self._lock:
+            self._memory[key] = output
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _store(self, stage, key, output):
+        self._remember(key, output)
+        if self.cache_dir is not None:
+            # Écriture atomique, comme ColumnCache
+            path = self._disk_path(stage, key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+
+    def clear_cache(self, disk=False):
+        """
+        Vide le cache mémoire (et le cache disque si disk=True).
+        """
+        with self._lock:
+            self._memory.clear()
+        if disk and self.cache_dir is not None:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".pkl"):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    # ------------------------------------------------------------------ exécution
+
+    def _execute(self, stage, key, inputs):
+        """Exécute (ou relit) une étape. Returns: (sortie, origine, durée)."""
+        start = time.perf_counter()
+        found = self._lookup(stage, key)
+        if found is not None:
+            origin, output = found
+        else:
+            method, _, _ = self.STAGES[stage]
+            output = getattr(self, method)(self.params[stage], *inputs)
+            self._store(stage, key, output)
+            origin = "computed"
+        return output, origin, time.perf_counter() - start
+
+    def run(self, targets=("synthesis", "noisy_synthesis")):
+        """
+        Exécute les étapes nécessaires aux cibles, en parallèle dès que leurs entrées sont
+        prêtes, en réutilisant les sorties en cache.
+
+        Args:
+            targets (tuple) : Étapes dont la sortie est demandée (par défaut tout le pipeline :
+                              signaux synthétiques sans et avec bruit)
+
+        Returns:
+            dict : {étape: sortie} pour toutes les étapes nécessaires
+        """
+        stages = self._required(targets)
+        keys = {}
+        for stage in stages:
+            keys[stage] = self._stage_key(stage, keys)
+
+        outputs, self.last_run = {}, {}
+        pending = list(stages)
+        with ThreadPoolExecutor(max_workers=self.n_jobs) as pool:
+            running = {}
+            while pending or running:
+                for stage in [s for s in pending
+                              if all(dep in outputs for dep in self.STAGES[s][1])]:
+                    inputs = [outputs[dep] for dep in self.STAGES[stage][1]]
+                    running[pool.submit(self._execute, stage, keys[stage], inputs)] = stage
+                    pending.remove(stage)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    output, origin, elapsed = future.result()
+                    outputs[stage] = output
+                    self.last_run[stage] = {"origin": origin, "seconds": elapsed}
+        return outputs
+
+
+if __name__ == "__main__":
+    # Démonstration : premier run complet, puis modification d’un seul paramètre de bruit
+    pipeline = Pipeline("../data/data1/Adrenaline.txt")
+
+    for label, change in [("1er run", None), ("même run", None),
+                          ("rr_noise_std=0.05", ("noise", {"rr_noise_std": 0.05})),
+                          ("distance_sec=0.35", ("peaks", {"distance_sec": 0.35}))]:
+        if change is not None:
+            pipeline.set_params(change[0], **change[1])
+        start = time.perf_counter()
+        outputs = pipeline.run()
+        computed = [stage for stage, info in pipeline.last_run.items()
+                    if info["origin"] == "computed"]
+        print(f"{label:>18} : {time.perf_counter() - start:6.2f} s, recalculées : {computed}")
@@ -0,0 +1,162 @@
+import numpy as np
+
+
+class PlotDownsampler:
+    """
+    Réduction des séries avant tracé, adaptée à la résolution de la figure.
+
+    Au-delà de quelques milliers de points par ligne, matplotlib dessine des pixels déjà
+    occupés : chaque série est ramenée à environ points_per_pixel × largeur de la figure
+    (en pixels), par un algorithme qui conserve les extrêmes, pour que les R-peaks et les
+    bornes de l’enveloppe restent visibles :
+        - "minmax" : minimum et maximum de chaque paquet d’échantillons (rendu identique
+          à l’œil au tracé complet, y compris les pics isolés)
+        - "lttb"   : Largest-Triangle-Three-Buckets (un point par paquet, forme globale)
+
+    Les séries déjà assez courtes sont tracées telles quelles.
+
+    Attributs :
+        enabled (bool)           : Réduction active (False : séries inchangées)
+        method (str)             : "minmax" ou "lttb"
+        points_per_pixel (float) : Nombre de points conservés par pixel de largeur
+        max_points (int)         : Nombre de points visé par série
+    """
+
+    def __init__(self, fig=None, enabled=True, method="minmax", points_per_pixel=2,
+                 max_points=None):
+        """
+        Args:
+            fig (Figure|None)        : Figure cible (sa largeur en pixels fixe max_points)
+            enabled (bool)           : Activer la réduction
+            method (str)             : "minmax" ou "lttb"
+            points_per_pixel (float) : Points conservés par pixel de largeur (par défaut 2)
+            max_points (int|None)    : Nombre de points imposé (prioritaire sur fig)
+        """
+        if method not in ("minmax", "lttb"):
+            raise ValueError(f"Méthode de réduction inconnue : {method}")
+
+        self.enabled = enabled
+        self.method = method
+        self.points_per_pixel = points_per_pixel
+        if max_points is None:
+            width_px = 1000 if fig is None else fig.get_figwidth() * fig.dpi
+            max_points = int(points_per_pixel * width_px)
+        self.max_points = max(max_points, 4)
+
+    def reduce(self, x, y):
+        """
+        Réduit une série (x, y) à environ max_points points.
+
+        Args:
+            x (array-like) : Abscisses (croissantes, ex. temps)
+            y (array-like) : Valeurs
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray] : Série réduite (ou inchangée)
+        """
+        x = np.asarray(x)
+        y = np.asarray(y)
+        if not self.enabled or len(y) <= self.max_points:
+            return x, y
+
+        if self.method == "minmax":
+            index = self.minmax_indices(y, self.max_points)
+        else:
+            index = self.lttb_indices(x, y, self.max_points)
+        return x[index], y[index]
+
+    @staticmethod
+    def minmax_indices(y, n_out):
+        """
+        Indices du minimum et du maximum de n_out // 2 paquets consécutifs, dans l’ordre.
+
+        Args:
+            y (np.ndarray) : Valeurs
+            n_out (int)    : Nombre de points visé
+
+        Returns:
+            np.ndarray : Indices conservés (triés, au plus n_out)
+        """
+        n = len(y)
+        n_buckets = max(n_out // 2, 1)
+        size = -(-n // n_buckets)
+        n_buckets = -(-n // size)
+
+        # Paquets de même taille ; le dernier est complété par des valeurs neutres
+        padded_low = np.full(n_buckets * size, np.inf)
+        padded_low[:n] = y
+        padded_high = np.full(n_buckets * size, -np.inf)
+        padded_high[:n] = y
+        offsets = np.arange(n_buckets) * size
+        lows = offsets + np.argmin(padded_low.reshape(n_buckets, size), axis=1)
+        highs = offsets + np.argmax(padded_high.reshape(n_buckets, size), axis=1)
+
+        index = np.unique(np.concatenate((lows, highs)))
+        return index[index < n]
+
+    @staticmethod
+    def lttb_indices(x, y, n_out):
+        """
+        Indices choisis par Largest-Triangle-Three-Buckets : dans chaque paquet, le point
+        formant le plus grand triangle avec le point retenu précédent et la moyenne du
+        paquet suivant. Le premier et le dernier point sont toujours conservés.
+
+        Args:
+            x (np.ndarray) : Abscisses
+            y (np.ndarray) : Valeurs
+            n_out (int)    : Nombre de points visé (>= 3)
+
+        Returns:
+            np.ndarray : Indices conservés (triés, n_out points)
+        """
+        n = len(y)
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+        # Moyenne de chaque paquet, par sommes cumulées
+        cum_x = np.concatenate(([0.0], np.cumsum(x)))
+        cum_y = np.concatenate(([0.0], np.cumsum(y)))
+        counts = np.maximum(edges[1:] - edges[:-1], 1)
+        mean_x = (cum_x[edges[1:]] - cum_x[edges[:-1]]) / counts
+        mean_y = (cum_y[edges[1:]] - cum_y[edges[:-1]]) / counts
+        mean_x = np.append(mean_x[1:], x[-1])
+        mean_y = np.append(mean_y[1:], y[-1])
+
+        index = np.empty(n_out, dtype=np.int64)
+        index[0], index[-1] = 0, n - 1
+        previous = 0
+        for bucket in range(n_out - 2):
+            lo, hi = edges[bucket], max(edges[bucket + 1], edges[bucket] + 1)
+            bx, by = x[lo:hi], y[lo:hi]
+            area = np.abs((x[previous] - mean_x[bucket]) * (by - y[previous])
+                          - (x[previous] - bx) * (mean_y[bucket] - y[previous]))
+            previous = lo + int(np.argmax(area))
+            index[bucket + 1] = previous
+        return index
+
+
+if __name__ == "__main__":
+    # Benchmark : tracé complet vs réduit d’un enregistrement de plusieurs heures
+    import time
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fs = 200
+    n = 4 * 3600 * fs
+    t = np.arange(n) / fs
+    rng = np.random.default_rng(0)
+    signal = 60 + rng.standard_normal(n)
+    signal[::160] += 20    # Pics isolés (R-peaks)
+
+    for label, enabled, method in [("complet", False, "minmax"), ("minmax", True, "minmax"),
+                                   ("lttb", True, "lttb")]:
+        start = time.perf_counter()
+        fig = plt.figure(figsize=(14, 4))
+        x, y = PlotDownsampler(fig, enabled=enabled, method=method).reduce(t, signal)
+        plt.plot(x, y)
+        fig.savefig("/dev/null", format="png")
+        plt.close(fig)
+        print(f"{label:>8} : {len(y):>8} points, {time.perf_counter() - start:.2f} s, "
+              f"max conservé {y.max() == signal.max()}")
@@ -0,0 +1,260 @@
+import time
+from collections import deque
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+class RealtimeMonitor:
+    """
+    Moniteur défilant en temps réel d’un signal reçu par morceaux (ex. SignalGenerator.iter_synthesis,
+    lecture de fichier au fil de l’eau).
+
+    Les window_seconds derniers échantillons sont gardés dans un tampon circulaire de taille
+    fixe : aucun tableau n’est réalloué par morceau ni par image (la fenêtre affichée est
+    recopiée dans un tableau préalloué). Le rafraîchissement est plafonné à max_fps et
+    utilise le blitting (fond et axes dessinés une seule fois). Les images sautées (rendu
+    plus lent que la cadence visée) et la latence d’affichage sont mesurées.
+
+    En mode headless (par défaut), le rendu se fait sur un canevas Agg sans fenêtre, ce qui
+    permet de mesurer le débit sans écran.
+
+    Attributs :
+        window_seconds (float) : Durée affichée (en s)
+        sampling_rate (float)  : Fréquence d’échantillonnage (Hz)
+        max_fps (float)        : Cadence maximale de rafraîchissement
+        headless (bool)        : Rendu Agg hors écran
+        n_samples (int)        : Nombre total d’échantillons reçus
+        frames_drawn (int)     : Nombre d’images dessinées
+        dropped_frames (int)   : Nombre d’images sautées par rapport à max_fps
+    """
+
+    def __init__(self, window_seconds=5, sampling_rate=200, max_fps=30, ylim=None,
+                 headless=True, title="Moniteur ECG (temps réel)"):
+        """
+        Args:
+            window_seconds (float) : Durée affichée (en s)
+            sampling_rate (float)  : Fréquence d’échantillonnage (Hz)
+            max_fps (float)        : Cadence maximale de rafraîchissement (images/s)
+            ylim (tuple|None)      : Limites verticales ; None : élargies automatiquement
+            headless (bool)        : Rendu Agg sans fenêtre (tests, benchmarks)
+            title (str)            : Titre de la figure
+        """
+        self.window_seconds = window_seconds
+        self.sampling_rate = sampling_rate
+        self.max_fps = max_fps
+        self.headless = headless
+        self.window_size = int(window_seconds * sampling_rate)
+
+        # Tampon circulaire et fenêtre ordonnée, alloués une seule fois
+        self._ring = np.full(self.window_size, np.nan)
+        self._display = np.full(self.window_size, np.nan)
+        self._write = 0
+
+        self._setup_figure(ylim, title)
+        self.reset_stats()
+
+    def _setup_figure(self, ylim, title):
+        """Crée la figure (Agg ou interactive), la ligne animée et le fond pour le blitting."""
+        if self.headless:
+            self.fig = Figure(figsize=(10, 4))
+            FigureCanvasAgg(self.fig)
+            self.ax = self.fig.add_subplot()
+        else:
+            self.fig, self.ax = plt.subplots(figsize=(10, 4))
+            plt.show(block=False)
+
+        self.ax.set_xlim(0, self.window_seconds)
+        self.ax.set_xlabel("Temps (s)")
+        self.ax.set_ylabel("Amplitude")
+        self.ax.set_title(title)
+        self.ax.grid(True)
+        self._auto_ylim = ylim is None
+        self.ax.set_ylim(*(ylim if ylim is not None else (0, 1)))
+        self._ylim_set = ylim is not None
+
+        x = np.arange(self.window_size) / self.sampling_rate
+        self.line, = self.ax.plot(x, self._display, lw=2, color='crimson', animated=True)
+        self._capture_background()
+
+    def _capture_background(self):
+        """Dessine la figure sans la ligne et mémorise le fond (après un changement d’axes)."""
+        self.fig.canvas.draw()
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+    def reset_stats(self):
+        """
+        Remet à zéro les compteurs (échantillons, images, images sautées, latences).
+        """
+        self.n_samples = 0
+        self.frames_drawn = 0
+        self.dropped_frames = 0
+        self.background_redraws = 0
+        self._pending_since = None      # Arrivée du plus ancien échantillon non affiché
+        self._render_times = deque(maxlen=10_000)
+        self._latencies = deque(maxlen=10_000)
+        self._started = None
+
+    def push(self, chunk):
+        """
+        Ajoute un morceau au tampon circulaire (sans réallocation).
+
+        Args:
+            chunk (np.ndarray) : Nouveaux échantillons
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if len(chunk) == 0:
+            return
+        if self._pending_since is None:
+            self._pending_since = time.perf_counter()
+
+        self.n_samples += len(chunk)
+        chunk = chunk[-self.window_size:]
+        first = min(len(chunk), self.window_size - self._write)
+        self._ring[self._write:self._write + first] = chunk[:first]
+        self._ring[:len(chunk) - first] = chunk[first:]
+        self._write = (self._write + len(chunk)) % self.window_size
+
+        if self._auto_ylim:
+            self._extend_ylim(chunk)
+
+    def _extend_ylim(self, chunk):
+        """Élargit les limites verticales si le morceau en sort (le fond est alors redessiné)."""
+        low, high = np.nanmin(chunk), np.nanmax(chunk)
+        y_min, y_max = self.ax.get_ylim()
+        if self._ylim_set and y_min <= low and high <= y_max:
+            return
+        if self._ylim_set:
+            low, high = min(low, y_min), max(high, y_max)
+        margin = 0.1 * (high - low) or 1.0
+        self.ax.set_ylim(low - margin, high + margin)
+        self._ylim_set = True
+        self._capture_background()
+        self.background_redraws += 1
+
+    def render(self):
+        """
+        Redessine la fenêtre courante par blitting et enregistre durée de rendu et latence.
+        """
+        start = time.perf_counter()
+
+        # Fenêtre dans l’ordre chronologique, recopiée dans le tableau préalloué
+        tail = self.window_size - self._write
+        self._display[:tail] = self._ring[self._write:]
+        self._display[tail:] = self._ring[:self._write]
+        self.line.set_ydata(self._display)
+
+        canvas = self.fig.canvas
+        canvas.restore_region(self._background)
+        self.ax.draw_artist(self.line)
+        canvas.blit(self.fig.bbox)
+        if not self.headless:
+            canvas.flush_events()
+
+        end = time.perf_counter()
+        self._render_times.append(end - start)
+        if self._pending_since is not None:
+            self._latencies.append(end - self._pending_since)
+            self._pending_since = None
+        self.frames_drawn += 1
+
+    def run(self, chunks, realtime=False, duration=None):
+        """
+        Consomme des morceaux et rafraîchit l’affichage au plus max_fps fois par seconde.
+
+        Args:
+            chunks (iterable)    : Morceaux successifs du signal
+            realtime (bool)      : Cadencer la lecture sur sampling_rate (sinon au plus vite)
+            duration (float|None): Durée maximale de la boucle (en s, horloge murale)
+
+        Returns:
+            dict : Statistiques (voir stats)
+        """
+        interval = 1.0 / self.max_fps
+        self._started = time.perf_counter()
+        next_frame = self._started
+
+        for chunk in chunks:
+            self.push(chunk)
+
+            now = time.perf_counter()
+            if realtime:
+                # Attente de l’instant où le dernier échantillon reçu serait produit
+                delay = self._started + self.n_samples / self.sampling_rate - now
+                if delay > 0:
+                    time.sleep(delay)
+                    now = time.perf_counter()
+
+            if now >= next_frame:
+                missed = int((now - next_frame) // interval)
+                self.dropped_frames += missed
+                self.render()
+                next_frame += (missed + 1) * interval
+
+            if duration is not None and now - self._started >= duration:
+                break
+
+        if self._pending_since is not None:
+            self.render()
+        return self.stats()
+
+    def stats(self):
+        """
+        Statistiques de la dernière exécution.
+
+        Returns:
+            dict : frames_drawn, dropped_frames, fps, samples_per_second, render_ms (moyenne,
+            p95, max), latency_ms (moyenne, max), background_redraws
+        """
+        elapsed = time.perf_counter() - self._started if self._started else np.nan
+        render_ms = 1e3 * np.array(self._render_times) if self._render_times else np.array([np.nan])
+        latency_ms = 1e3 * np.array(self._latencies) if self._latencies else np.array([np.nan])
+        return {
+            "n_samples": self.n_samples,
+            "frames_drawn": self.frames_drawn,
+            "dropped_frames": self.dropped_frames,
+            "fps": self.frames_drawn / elapsed,
+            "samples_per_second": self.n_samples / elapsed,
+            "render_ms_mean": float(np.mean(render_ms)),
+            "render_ms_p95": float(np.percentile(render_ms, 95)),
+            "render_ms_max": float(np.max(render_ms)),
+            "latency_ms_mean": float(np.mean(latency_ms)),
+            "latency_ms_max": float(np.max(latency_ms)),
+            "background_redraws": self.background_redraws,
+        }
+
+    def close(self):
+        """
+        Ferme la figure.
+        """
+        if not self.headless:
+            plt.close(self.fig)
+
+
+if __name__ == "__main__":
+    # Benchmark headless : débit et latence sur un flux synthétique de SignalGenerator
+    from signal_generator import SignalGenerator
+
+    fs = 200
+    rng = np.random.default_rng(0)
+    rr = np.clip(0.8 + 0.05 * rng.standard_normal(5000), 0.4, None)
+    amplitudes = rng.uniform(15, 25, len(rr))
+    generator = SignalGenerator(sampling_rate=fs)
+
+    for max_fps in [30, 60, 1000]:
+        monitor = RealtimeMonitor(window_seconds=5, sampling_rate=fs, max_fps=max_fps)
+        chunks = generator.iter_synthesis(rr, amplitudes, chunk_size=20, use_templates=True)
+        stats = monitor.run(chunks)
+        print(f"max_fps={max_fps:>4} : {stats['samples_per_second'] / 1e3:.0f} k éch./s, "
+              f"{stats['fps']:.0f} images/s, sautées {stats['dropped_frames']}, "
+              f"rendu {stats['render_ms_mean']:.2f} ms (p95 {stats['render_ms_p95']:.2f}), "
+              f"latence {stats['latency_ms_mean']:.2f} ms")
+
+    # Lecture cadencée en temps réel pendant 3 s
+    monitor = RealtimeMonitor(window_seconds=5, sampling_rate=fs, max_fps=30)
+    chunks = generator.iter_synthesis(rr, amplitudes, chunk_size=4, use_templates=True)
+    stats = monitor.run(chunks, realtime=True, duration=3)
+    print(f"temps réel : {stats['fps']:.1f} images/s, sautées {stats['dropped_frames']}, "
+          f"latence max {stats['latency_ms_max']:.1f} ms")
@@ -0,0 +1,198 @@
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from data_loader import DataLoader
+
+
+class RecordingDataset:
+    """
+    Ensemble des enregistrements (.txt) d'un dossier d'expériences, chargés via DataLoader.
+
+    Les enregistrements sont découverts récursivement sous `root` et identifiés par leur
+    chemin relatif sans extension (ex. "data1/Adrenaline"), ou par leur nom de condition
+    (ex. "Adrenaline") lorsqu'il est unique. Le chargement est paresseux et le nombre
+    d'enregistrements gardés en mémoire est borné (éviction LRU).
+
+    Attributs :
+        root (str)            : Dossier racine des données
+        interval_ms (float)   : Intervalle d'échantillonnage transmis à DataLoader
+        engine (str)          : Moteur de lecture transmis à DataLoader.load
+        cache (ColumnCache)   : Cache binaire partagé (facultatif)
+        max_in_memory (int)   : Nombre maximal d'enregistrements gardés en mémoire
+        recordings (dict)     : {identifiant: chemin du fichier}
+    """
+
+    def __init__(self, root="../data", interval_ms=5, engine="c", cache=None, max_in_memory=4):
+        """
+        Args:
+            root (str)          : Dossier racine à parcourir
+            interval_ms (float) : Intervalle d'échantillonnage en ms (par défaut 5 ms → 200 Hz)
+            engine (str)        : "c" (rapide) ou "python" (historique)
+            cache (ColumnCache) : Cache binaire des colonnes (facultatif)
+            max_in_memory (int) : Nombre maximal d'enregistrements gardés en mémoire
+        """
+        self.root = root
+        self.interval_ms = interval_ms
+        self.engine = engine
+        self.cache = cache
+        self.max_in_memory = max_in_memory
+        self.recordings = self._discover()
+        self._loaded = OrderedDict()
+
+    def _discover(self):
+        """
+        Recherche récursivement les fichiers .txt sous root.
+
+        Returns:
+            dict : {identifiant relatif sans extension: chemin du fichier}, trié
+        """
+        if not os.path.isdir(self.root):
+            raise FileNotFoundError(f"Dossier introuvable : {self.root}")
+
+        recordings = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.lower().endswith(".txt"):
+                    path = os.path.join(dirpath, name)
+                    key = os.path.splitext(os.path.relpath(path, self.root))[0]
+                    recordings[key.replace(os.sep, "/")] = path
+        return dict(sorted(recordings.items()))
+
+    def conditions(self):
+        """
+        Liste des noms de conditions disponibles (ex. "Adrenaline", "Euthanasie").
+
+        Returns:
+            list : Noms de conditions triés, sans doublon
+        """
+        return sorted({key.split("/")[-1] for key in self.recordings})
+
+    def resolve(self, name):
+        """
+        Résout un identifiant ou un nom de condition en identifiant d'enregistrement.
+
+        Args:
+            name (str) : Identifiant ("data1/Adrenaline") ou condition ("Adrenaline")
+
+        Returns:
+            str : Identifiant de l'enregistrement
+        """
+        if name in self.recordings:
+            return name
+
+        matches = [key for key in self.recordings if key.split("/")[-1] == name]
+        if not matches:
+            raise KeyError(f"Enregistrement inconnu : {name}")
+        if len(matches) > 1:
+            raise KeyError(
+                f"Condition ambiguë : {name} → {matches} (préciser le dossier)")
+        return matches[0]
+
+    @staticmethod
+    def _load_one(filepath, interval_ms, engine, cache):
+        """
+        Charge un enregistrement dans un processus de travail.
+        Avec un cache, le processus écrit seulement l'entrée du cache : le processus
+        principal la relit ensuite par memory-map, sans transfert des données.
+
+        Returns:
+            pd.DataFrame | None : Données chargées (None si elles sont dans le cache)
+        """
+        data = DataLoader(filepath, interval_ms, cache=cache).load(engine=engine)
+        return None if cache is not None else data
+
+    def _remember(self, key, data):
+        """Ajoute un enregistrement en mémoire en respectant max_in_memory (LRU)."""
+        self._loaded[key] = data
+        self._loaded.move_to_end(key)
+        while len(self._loaded) > self.max_in_memory:
+            self._loaded.popitem(last=False)
+
+    def load(self, name):
+        """
+        Charge (ou relit depuis la mémoire) un enregistrement.
+
+        Args:
+            name (str) : Identifiant ou nom de condition
+
+        Returns:
+            pd.DataFrame : Données nettoyées de l'enregistrement
+        """
+        key = self.resolve(name)
+        if key in self._loaded:
+            self._loaded.move_to_end(key)
+            return self._loaded[key]
+
+        loader = DataLoader(self.recordings[key], self.interval_ms, cache=self.cache)
+        data = loader.load(engine=self.engine)
+        self._remember(key, data)
+        return data
+
+    def __getitem__(self, name):
+        return self.load(name)
+
+    def __len__(self):
+        return len(self.recordings)
+
+    def __iter__(self):
+        return iter(self.recordings)
+
+    def iter_parallel(self, names=None, n_jobs=None):
+        """
+        Charge des enregistrements en parallèle (pool de processus) et les renvoie
+        au fur et à mesure. Au plus max_in_memory chargements sont en cours ou en
+        attente de consommation à la fois, ce qui borne la mémoire utilisée.
+
+        Args:
+            names (list|None) : Identifiants ou conditions (par défaut tous)
+            n_jobs (int|None) : Nombre de processus (par défaut : nombre de cœurs)
+
+        Yields:
+            Tuple[str, pd.DataFrame] : identifiant et données, dans l'ordre de fin de chargement
+        """
+        keys = list(self.recordings) if names is None else [
+            self.resolve(name) for name in names]
+        pending = iter(keys)
+
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = {}
+
+            def submit_next():
+                key = next(pending, None)
+                if key is not None:
+                    future = pool.submit(self._load_one, self.recordings[key],
+                                         self.interval_ms, self.engine, self.cache)
+                    futures[future] = key
+
+            for _ in range(max(1, self.max_in_memory)):
+                submit_next()
+
+            while futures:
+                future = next(as_completed(futures))
+                key = futures.pop(future)
+                data = future.result()
+                if data is None:
+                    # Relecture par memory-map de l'entrée écrite par le processus
+                    data = DataLoader(self.recordings[key], self.interval_ms,
+                                      cache=self.cache).load(engine=self.engine)
+                # Soumission après consommation : au plus max_in_memory enregistrements
+                # chargés ou en cours de chargement à la fois
+                yield key, data
+                submit_next()
+
+    def load_all(self, names=None, n_jobs=None):
+        """
+        Charge en parallèle des enregistrements et les garde en mémoire (dans la limite
+        de max_in_memory : au-delà, seuls les derniers chargés sont conservés).
+
+        Args:
+            names (list|None) : Identifiants ou conditions (par défaut tous)
+            n_jobs (int|None) : Nombre de processus (par défaut : nombre de cœurs)
+
+        Returns:
+            dict : {identifiant: pd.DataFrame} des enregistrements conservés en mémoire
+        """
+        for key, data in self.iter_parallel(names, n_jobs=n_jobs):
+            self._remember(key, data)
+        return dict(self._loaded)
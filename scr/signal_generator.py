@@ -1,5 +1,9 @@
 import numpy as np
-import matplotlib.pyplot as plt
+from collections import OrderedDict
+import itertools
+
+from plot_downsampler import PlotDownsampler
+from figure_renderer import FigureRenderer
 
 
 class SignalGenerator:
@@ -14,29 +18,129 @@ class SignalGenerator:
     - Visualisation zoomable
     """
 
-    def __init__(self, sampling_rate=200):
+    # Ondes P, Q, R, S, T : (centre, largeur, amplitude) relatifs à la durée et à l’amplitude
+    WAVES = [(0.20, 0.025, 0.1), (0.35, 0.010, -0.2), (0.40, 0.012, 0.7),
+             (0.45, 0.010, -0.3), (0.60, 0.050, 0.2)]
+
+    def __init__(self, sampling_rate=200, template_cache_size=512):
         """
         Args:
-            sampling_rate (int): Taux d’échantillonnage en Hz (par défaut : 200 Hz)
+            sampling_rate (int)       : Taux d’échantillonnage en Hz (par défaut : 200 Hz)
+            template_cache_size (int) : Nombre de gabarits de battement gardés en cache (LRU)
         """
         self.sampling_rate = sampling_rate
         self.signal_flat = None        # Signal sans tendance
         self.signal_final = None       # Signal final avec tendance ajoutée
         self.time = None               # Axe temporel associé
+        self.r_peak_positions = None   # Indices des pics R dans signal_flat
+
+        # Cache LRU des gabarits unitaires, indexé par la longueur en échantillons
+        self.template_cache_size = template_cache_size
+        self._templates = OrderedDict()
+        self.template_hits = 0
+        self.template_misses = 0
+
+    def _unit_template(self, length, count=1):
+        """
+        Gabarit d’un battement d’amplitude 1 et de `length` échantillons (cache LRU).
+
+        La forme ne dépend que de la longueur : l’onde i vaut w_i·exp(-0.5·((j/L - c_i)/s_i)²).
+
+        Args:
+            length (int) : Nombre d’échantillons du battement
+            count (int)  : Nombre de battements servis par cette consultation (pour les compteurs)
+
+        Returns:
+            np.ndarray : Gabarit unitaire (lecture seule)
+        """
+        template = self._templates.get(length)
+        if template is not None:
+            self._templates.move_to_end(length)
+            self.template_hits += count
+            return template
+
+        self.template_misses += 1
+        self.template_hits += count - 1
+        x = np.arange(length) / length
+        template = np.zeros(length)
+        for center, width, weight in self.WAVES:
+            template += weight * np.exp(-0.5 * ((x - center) / width) ** 2)
+        template.flags.writeable = False
+
+        self._templates[length] = template
+        while len(self._templates) > self.template_cache_size:
+            self._templates.popitem(last=False)
+        return template
+
+    def template_cache_info(self):
+        """
+        Statistiques du cache de gabarits (pour vérifier son efficacité sur de vraies séries R-R).
+
+        Returns:
+            dict : hits, misses, hit_rate, size, max_size
+        """
+        total = self.template_hits + self.template_misses
+        return {
+            "hits": self.template_hits,
+            "misses": self.template_misses,
+            "hit_rate": self.template_hits / total if total else np.nan,
+            "size": len(self._templates),
+            "max_size": self.template_cache_size,
+        }
+
+    def clear_template_cache(self):
+        """
+        Vide le cache de gabarits et remet les compteurs à zéro.
+        """
+        self._templates.clear()
+        self.template_hits = 0
+        self.template_misses = 0
 
-    def generate_ecg_beat(self, duration, amplitude=1.0):
+    def generate_ecg_beats(self, length, amplitudes):
+        """
+        Génère d’un bloc tous les battements d’une même longueur (une ligne par amplitude).
+
+        Args:
+            length (int)            : Nombre d’échantillons de chaque battement
+            amplitudes (np.ndarray) : Amplitudes des battements
+
+        Returns:
+            tuple (ecg, r_index):
+                - ecg (np.ndarray)     : Battements, tableau 2-D (n_battements, length)
+                - r_index (np.ndarray) : Index du pic R de chaque battement
+        """
+        amplitudes = np.asarray(amplitudes, dtype=np.float64)
+        template = self._unit_template(length, count=len(amplitudes))
+        ecg = amplitudes[:, np.newaxis] * template[np.newaxis, :]
+
+        # Pic R : maximum du gabarit (amplitude > 0), minimum (amplitude < 0), 0 sinon
+        r_index = np.where(amplitudes > 0, np.argmax(template),
+                           np.where(amplitudes < 0, np.argmin(template), 0))
+        return ecg, r_index
+
+    def generate_ecg_beat(self, duration, amplitude=1.0, use_cache=True):
         """
         Génère un battement ECG synthétique sous forme de somme de gaussiennes : ondes P, Q, R, S, T.
 
+        Par défaut le battement est obtenu en mettant à l’échelle un gabarit unitaire mis en
+        cache (écart relatif ~1e-16 avec le calcul direct) ; use_cache=False recalcule
+        directement les gaussiennes.
+
         Args:
             duration (float): Durée du battement en secondes (issue de l’intervalle R-R)
             amplitude (float): Amplitude globale du battement
+            use_cache (bool): Utiliser le cache de gabarits (par défaut True)
 
         Returns:
             tuple (ecg, r_index):
                 - ecg (np.ndarray) : Signal du battement
                 - r_index (int)    : Index du pic R dans le battement
         """
+        if use_cache:
+            ecg, r_index = self.generate_ecg_beats(
+                int(self.sampling_rate * duration), [amplitude])
+            return ecg[0], int(r_index[0])
+
         t = np.linspace(0, duration, int(
             self.sampling_rate * duration), endpoint=False)
         ecg = np.zeros_like(t)
@@ -59,40 +163,290 @@ class SignalGenerator:
         r_index = np.argmax(ecg)
         return ecg, r_index
 
-    def tile_signal_from_arrays(self, rr_intervals, amplitudes):
+    def _beats_flat(self, durations, amplitudes, use_templates=False):
+        """
+        Évalue d’un bloc plusieurs battements mis bout à bout. Sans gabarits, les opérations
+        flottantes sont celles de generate_ecg_beat(use_cache=False) (valeurs identiques) ;
+        avec gabarits, chaque battement est un gabarit unitaire mis à l’échelle.
+
+        Args:
+            durations (np.ndarray)  : Durées des battements (en s)
+            amplitudes (np.ndarray) : Amplitudes des battements
+            use_templates (bool)    : Utiliser le cache de gabarits
+
+        Returns:
+            tuple (ecg, lengths, starts):
+                - ecg (np.ndarray)     : Battements concaténés
+                - lengths (np.ndarray) : Nombre d’échantillons de chaque battement
+                - starts (np.ndarray)  : Position de chaque battement dans ecg
+        """
+        lengths = (self.sampling_rate * durations).astype(np.int64)
+        if np.any(lengths <= 0):
+            raise ValueError("Intervalle R-R trop court : battement vide.")
+
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        beat_id = np.repeat(np.arange(len(lengths)), lengths)
+        sample_in_beat = np.arange(len(beat_id)) - starts[beat_id]
+        amplitude = amplitudes[beat_id]
+
+        if use_templates:
+            # Gabarits des longueurs présentes, mis bout à bout dans une banque
+            unique_lengths, inverse, counts = np.unique(
+                lengths, return_inverse=True, return_counts=True)
+            bank = np.concatenate([self._unit_template(int(length), int(count))
+                                   for length, count in zip(unique_lengths, counts)])
+            bank_starts = np.concatenate(([0], np.cumsum(unique_lengths)[:-1]))
+            ecg = amplitude * bank[bank_starts[inverse][beat_id] + sample_in_beat]
+            return ecg, lengths, starts
+
+        duration = durations[beat_id]
+        t = sample_in_beat * (durations / lengths)[beat_id]
+
+        ecg = np.zeros(len(t))
+        for center, width, weight in self.WAVES:
+            ecg += (weight * amplitude) * np.exp(
+                -0.5 * ((t - center * duration) / (width * duration)) ** 2)
+        return ecg, lengths, starts
+
+    def _r_indices(self, ecg, lengths, starts):
+        """Index du pic R (premier maximum) de chaque battement concaténé dans ecg."""
+        beat_max = np.maximum.reduceat(ecg, starts)
+        is_max = ecg == np.repeat(beat_max, lengths)
+        positions = np.flatnonzero(is_max)
+        beat_of_position = np.searchsorted(starts, positions, side='right') - 1
+        _, first = np.unique(beat_of_position, return_index=True)
+        return positions[first] - starts
+
+    def synthesize(self, rr_intervals, amplitudes, batch_beats=65536, use_templates=False):
+        """
+        Moteur de synthèse vectorisé : calcule d’abord la place de chaque battement, puis
+        écrit tous les battements dans un tableau préalloué, par blocs de battements.
+
+        Le placement reproduit exactement tile_signal_from_arrays historique : chaque
+        battement est ajouté à la suite du précédent, amputé de ses premiers échantillons
+        quand son pic R est plus tardif que tous les précédents (max courant des index R),
+        avec un éventuel intervalle de zéros. Le signal produit est identique.
+
+        Args:
+            rr_intervals (np.ndarray): Tableau des intervalles R-R (en secondes)
+            amplitudes (np.ndarray)  : Tableau des amplitudes correspondantes
+            batch_beats (int)        : Nombre de battements évalués par bloc (borne la mémoire)
+            use_templates (bool)     : Battements issus du cache de gabarits (plus rapide,
+                                       écart relatif ~1e-16 avec le calcul historique)
+
+        Returns:
+            tuple (signal, r_peak_positions):
+                - signal (np.ndarray)           : Signal ECG synthétique sans tendance
+                - r_peak_positions (np.ndarray) : Index de chaque pic R dans le signal
+        """
+        n_beats = min(len(rr_intervals), len(amplitudes))
+        durations = np.asarray(rr_intervals, dtype=np.float64)[:n_beats]
+        amplitudes = np.asarray(amplitudes, dtype=np.float64)[:n_beats]
+
+        if n_beats == 0:
+            return np.array([]), np.array([], dtype=np.int64)
+
+        # 1re passe : longueur et index R de chaque battement
+        lengths = np.empty(n_beats, dtype=np.int64)
+        r_index = np.empty(n_beats, dtype=np.int64)
+        for b0 in range(0, n_beats, batch_beats):
+            batch = slice(b0, b0 + batch_beats)
+            beats = self._beats_flat(durations[batch], amplitudes[batch], use_templates)
+            ecg, lengths[batch], starts = beats
+            r_index[batch] = self._r_indices(ecg, lengths[batch], starts)
+
+        # Placement : le R de référence est le max courant des index R précédents
+        reference = np.concatenate(([0], np.maximum.accumulate(r_index)[:-1]))
+        reference = np.maximum(reference, 0)
+        start_index = reference - r_index
+        trim = np.maximum(-start_index, 0)
+        start_index = np.maximum(start_index, 0)
+        kept = lengths - trim
+
+        # Intervalle de zéros si le début voulu dépasse la fin actuelle du signal
+        appended = np.concatenate(([0], np.cumsum(kept)[:-1]))
+        gaps_after = np.maximum.accumulate(np.maximum(start_index - appended, 0))
+        offsets = appended + gaps_after
+        total = offsets[-1] + kept[-1]
+
+        # 2e passe : écriture des battements dans le tableau préalloué
+        signal = np.zeros(total)
+        for b0 in range(0, n_beats, batch_beats):
+            batch = slice(b0, b0 + batch_beats)
+            if n_beats > batch_beats:
+                # Plusieurs blocs : réévaluation plutôt que conservation de tous les battements
+                beats = self._beats_flat(durations[batch], amplitudes[batch], use_templates)
+            ecg, lengths_b, starts = beats
+            beat_id = np.repeat(np.arange(len(lengths_b)), lengths_b)
+            sample_in_beat = np.arange(len(ecg)) - starts[beat_id]
+            keep = sample_in_beat >= trim[batch][beat_id]
+            destination = offsets[batch][beat_id] + sample_in_beat - trim[batch][beat_id]
+            signal[destination[keep]] = ecg[keep]
+
+        r_peak_positions = offsets + r_index - trim
+        return signal, r_peak_positions
+
+    def tile_signal_from_arrays(self, rr_intervals, amplitudes, use_templates=False):
         """
         Construit un signal complet en assemblant des battements ECG générés à partir des durées R-R
-        et des amplitudes extraites.
+        et des amplitudes extraites (via le moteur vectorisé synthesize).
 
         Args:
             rr_intervals (np.ndarray): Tableau des intervalles R-R (en secondes)
             amplitudes (np.ndarray)  : Tableau des amplitudes correspondantes
+            use_templates (bool)     : Battements issus du cache de gabarits (voir synthesize)
 
         Returns:
             np.ndarray : Signal ECG synthétique sans tendance
         """
-        signal = []
-        r_peak_positions = []
-        last_r_global = 0
+        self.signal_flat, self.r_peak_positions = self.synthesize(
+            rr_intervals, amplitudes, use_templates=use_templates)
+        self.time = np.arange(len(self.signal_flat)) / self.sampling_rate
+        return self.signal_flat
 
-        for rr, amp in zip(rr_intervals, amplitudes):
-            beat, r_index = self.generate_ecg_beat(duration=rr, amplitude=amp)
+    def _place_beats(self, lengths, r_index, state):
+        """
+        Placement d’un bloc de battements (même règle que synthesize), à partir de l’état
+        courant du flux : state = {"reference": max courant des index R, "position": longueur
+        déjà produite}. L’état est mis à jour pour le bloc suivant.
 
-            start_index = last_r_global - r_index
-            if start_index < 0:
-                beat = beat[-start_index:]
-                start_index = 0
+        Returns:
+            tuple (offsets, trim) : position globale du premier échantillon conservé de
+            chaque battement et nombre d’échantillons retirés en tête
+        """
+        reference = np.maximum.accumulate(np.concatenate(([state["reference"]], r_index)))
+        start_index = reference[:-1] - r_index
+        trim = np.maximum(-start_index, 0)
+        start_index = np.maximum(start_index, 0)
+        kept = lengths - trim
 
-            if len(signal) < start_index:
-                signal += [0] * (start_index - len(signal))
+        appended = state["position"] + np.concatenate(([0], np.cumsum(kept)[:-1]))
+        offsets = appended + np.maximum.accumulate(np.maximum(start_index - appended, 0))
 
-            signal += list(beat)
-            last_r_global = start_index + r_index
-            r_peak_positions.append(last_r_global)
+        state["reference"] = reference[-1]
+        state["position"] = offsets[-1] + kept[-1]
+        return offsets, trim
 
-        self.signal_flat = np.array(signal)
-        self.time = np.arange(len(self.signal_flat)) / self.sampling_rate
-        return self.signal_flat
+    def iter_synthesis(self, rr_intervals, amplitudes, trend=None, chunk_size=65536,
+                       n_samples=None, batch_beats=4096, use_templates=False):
+        """
+        Synthèse en flux : produit le signal final (battements + tendance) par morceaux de
+        taille fixe, avec une mémoire indépendante de la durée totale.
+
+        Les battements sont lus par blocs de batch_beats dans les itérables R-R et amplitudes,
+        placés comme dans synthesize (un battement à cheval sur deux morceaux est découpé,
+        l’état de placement est conservé) : la concaténation des morceaux est identique à
+        synthesize(...)[0] + tendance. La tendance suit la règle de apply_trend : si elle est
+        plus courte que le signal, sa dernière valeur est prolongée.
+
+        Args:
+            rr_intervals (iterable)  : Intervalles R-R (en s), éventuellement infinis (générateur)
+            amplitudes (iterable)    : Amplitudes correspondantes
+            trend (iterable|None)    : Tableau de tendance, ou itérable de scalaires ou de
+                                       tableaux successifs (None : signal sans tendance)
+            chunk_size (int)         : Nombre d’échantillons par morceau
+            n_samples (int|None)     : Longueur totale à produire (None : jusqu’à épuisement
+                                       des battements)
+            batch_beats (int)        : Nombre de battements évalués par bloc
+            use_templates (bool)     : Battements issus du cache de gabarits
+
+        Yields:
+            np.ndarray : Morceaux successifs du signal (le dernier peut être plus court)
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size doit être strictement positif.")
+
+        beats = zip(rr_intervals, amplitudes)
+        if isinstance(trend, np.ndarray):
+            # Tableau déjà en mémoire : un seul bloc, découpé par vues (pas élément par élément)
+            trend = [trend]
+        trend_chunks = None if trend is None else (np.atleast_1d(np.asarray(
+            value, dtype=np.float64)).ravel() for value in trend)
+        trend_rest = np.empty(0)
+        trend_last = 0.0
+
+        def take_trend(count):
+            # Extrait count valeurs de tendance, en prolongeant la dernière si épuisée
+            nonlocal trend_rest, trend_last
+            parts, needed = [], count
+            while needed > 0:
+                if len(trend_rest) == 0:
+                    trend_rest = next(trend_chunks, None)
+                    if trend_rest is None:
+                        trend_rest = np.empty(0)
+                        parts.append(np.full(needed, trend_last))
+                        break
+                    continue
+                part, trend_rest = trend_rest[:needed], trend_rest[needed:]
+                trend_last = part[-1]
+                parts.append(part)
+                needed -= len(part)
+            return np.concatenate(parts) if parts else np.empty(0)
+
+        state = {"reference": 0, "position": 0}
+        pending = np.empty(0)   # Échantillons produits mais pas encore émis
+        emitted = 0
+
+        while n_samples is None or emitted < n_samples:
+            batch = list(itertools.islice(beats, batch_beats))
+            if batch:
+                durations, amps = np.array(batch, dtype=np.float64).T
+                ecg, lengths, starts = self._beats_flat(durations, amps, use_templates)
+                r_index = self._r_indices(ecg, lengths, starts)
+                begin = state["position"]
+                offsets, trim = self._place_beats(lengths, r_index, state)
+
+                # Écriture du bloc (zéros éventuels compris) à la suite des échantillons en attente
+                block = np.zeros(state["position"] - begin)
+                beat_id = np.repeat(np.arange(len(lengths)), lengths)
+                sample_in_beat = np.arange(len(ecg)) - starts[beat_id]
+                keep = sample_in_beat >= trim[beat_id]
+                destination = offsets[beat_id] + sample_in_beat - trim[beat_id] - begin
+                block[destination[keep]] = ecg[keep]
+                pending = np.concatenate((pending, block))
+
+            finished = len(batch) < batch_beats
+            while len(pending) >= chunk_size or (finished and len(pending)):
+                size = min(chunk_size, len(pending))
+                if n_samples is not None:
+                    size = min(size, n_samples - emitted)
+                chunk, pending = pending[:size], pending[size:]
+                if trend_chunks is not None:
+                    chunk = chunk + take_trend(size)
+                emitted += size
+                yield chunk
+                if n_samples is not None and emitted >= n_samples:
+                    return
+            if finished:
+                return
+
+    def synthesize_to_file(self, path, rr_intervals, amplitudes, n_samples, trend=None,
+                           chunk_size=65536, **kwargs):
+        """
+        Synthèse en flux écrite directement dans un fichier .npy memory-mappé.
+
+        Args:
+            path (str)              : Fichier de sortie (.npy)
+            rr_intervals (iterable) : Intervalles R-R (en s)
+            amplitudes (iterable)   : Amplitudes correspondantes
+            n_samples (int)         : Taille du fichier (nombre maximal d’échantillons)
+            trend (iterable|None)   : Valeurs de tendance (voir iter_synthesis)
+            chunk_size (int)        : Nombre d’échantillons par morceau
+            **kwargs                : Autres options de iter_synthesis
+
+        Returns:
+            np.memmap : Signal écrit, limité aux échantillons produits (si les battements
+            s’épuisent avant n_samples, la fin du fichier reste à zéro)
+        """
+        output = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64,
+                                           shape=(n_samples,))
+        written = 0
+        for chunk in self.iter_synthesis(rr_intervals, amplitudes, trend, chunk_size,
+                                         n_samples=n_samples, **kwargs):
+            output[written:written + len(chunk)] = chunk
+            written += len(chunk)
+        output.flush()
+        return output[:written]
 
     def apply_trend(self, trend_array):
         """
@@ -113,7 +467,8 @@ class SignalGenerator:
         self.signal_final = self.signal_flat + trend_array
         return self.signal_final
 
-    def plot(self, zoom_start=None, zoom_end=None, title=""):
+    def plot(self, zoom_start=None, zoom_end=None, title="", downsample=True, show=True,
+             headless=False):
         """
         Affiche le signal généré (complet ou zoomé sur une plage donnée).
 
@@ -121,10 +476,16 @@ class SignalGenerator:
             zoom_start (float): Temps de début du zoom (en secondes)
             zoom_end (float)  : Temps de fin du zoom (en secondes)
             title (str)       : Titre du graphique
+            downsample (bool) : Réduire le signal à la résolution de la figure
+            show (bool)       : Afficher la figure
+            headless (bool)   : Figure Agg hors pyplot, renvoyée sans affichage (FigureRenderer)
+
+        Returns:
+            Figure | None : Figure créée (None si aucun signal n’a été généré)
         """
         if self.time is None or self.signal_final is None:
             print("Signal non généré.")
-            return
+            return None
 
         t = self.time
         s = self.signal_final
@@ -134,17 +495,19 @@ class SignalGenerator:
             t = t[mask]
             s = s[mask]
 
-        plt.figure(figsize=(14, 4))
-        plt.plot(t, s, label="Signal généré")
-        plt.title(title)
-        plt.xlabel("Temps (s)")
-        plt.ylabel("Amplitude")
-        plt.grid(True)
-        plt.legend()
-        plt.tight_layout()
-        plt.show()
-
-    def plot_custom_signal(self, signal, time, zoom_start=None, zoom_end=None, title="Signal généré (custom)"):
+        fig, ax = FigureRenderer.new_figure((14, 4), headless)
+        reducer = PlotDownsampler(fig, enabled=downsample)
+        ax.plot(*reducer.reduce(t, s), label="Signal généré")
+        ax.set_title(title)
+        ax.set_xlabel("Temps (s)")
+        ax.set_ylabel("Amplitude")
+        ax.grid(True)
+        ax.legend()
+        fig.tight_layout()
+        return FigureRenderer.finish(fig, show=show, headless=headless)
+
+    def plot_custom_signal(self, signal, time, zoom_start=None, zoom_end=None, title="Signal généré (custom)",
+                           downsample=True, show=True, headless=False):
         """
         Affiche n'importe quel signal donné avec son axe temporel (utile pour les signaux bruités ou alternatifs).
 
@@ -154,10 +517,16 @@ class SignalGenerator:
             zoom_start (float) : Zoom début
             zoom_end (float)   : Zoom fin
             title (str)        : Titre de la figure
+            downsample (bool)  : Réduire le signal à la résolution de la figure
+            show (bool)        : Afficher la figure
+            headless (bool)    : Figure Agg hors pyplot, renvoyée sans affichage (FigureRenderer)
+
+        Returns:
+            Figure | None : Figure créée (None si signal ou temps manquant)
         """
         if signal is None or time is None:
             print("Signal ou temps manquant.")
-            return
+            return None
 
         t = time
         s = signal
@@ -167,12 +536,13 @@ class SignalGenerator:
             t = t[mask]
             s = s[mask]
 
-        plt.figure(figsize=(14, 4))
-        plt.plot(t, s, label="Signal (custom)", color='darkred')
-        plt.title(title)
-        plt.xlabel("Temps (s)")
-        plt.ylabel("Amplitude")
-        plt.grid(True)
-        plt.legend()
-        plt.tight_layout()
-        plt.show()
+        fig, ax = FigureRenderer.new_figure((14, 4), headless)
+        reducer = PlotDownsampler(fig, enabled=downsample)
+        ax.plot(*reducer.reduce(t, s), label="Signal (custom)", color='darkred')
+        ax.set_title(title)
+        ax.set_xlabel("Temps (s)")
+        ax.set_ylabel("Amplitude")
+        ax.grid(True)
+        ax.legend()
+        fig.tight_layout()
+        return FigureRenderer.finish(fig, show=show, headless=headless)
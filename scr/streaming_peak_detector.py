@@ -0,0 +1,197 @@
+from scipy.signal import find_peaks, peak_prominences
+import numpy as np
+
+
+class StreamingPeakDetector:
+    """
+    Détection en ligne des R-peaks, sur un signal reçu par morceaux successifs.
+
+    Mêmes critères que PeakDetector.detect_r_peaks_manual (distance_sec, prominence) :
+    à chaque morceau, find_peaks est appliqué sur un tampon borné (look-back + nouveaux
+    échantillons) et seuls les pics situés à plus de latency_sec de la fin du tampon sont
+    confirmés. find_peaks applique la sélection par distance à tous les maxima locaux,
+    avant la proéminence : sur un signal réel (bruit, ondes secondaires), des chaînes de
+    candidats espacés de moins de distance_sec peuvent durer plusieurs secondes, et le
+    choix dépend alors de la fin de la chaîne. latency_sec doit couvrir ces chaînes : avec
+    5 s (par défaut), les pics émis sont identiques à la détection globale sur les
+    enregistrements HR de data1, quelle que soit la taille des morceaux ; avec 2 s, des
+    pics diffèrent sur Adrenaline.
+
+    Deux maxima locaux de même hauteur à moins de distance_sec sont départagés en gardant
+    le plus ancien (find_peaks les ordonne par un tri instable sur tous les maxima du
+    tableau, que le tampon ne peut pas reproduire). Si une chaîne dépasse latency_sec, un
+    pic déjà émis n'est jamais remis en cause : un candidat confirmé ensuite à moins de
+    distance_sec de lui est abandonné, même s'il est plus haut. L'écart entre deux pics
+    émis est donc toujours d'au moins distance_sec, mais le pic retenu et le nombre de pics
+    peuvent alors différer localement de la détection globale.
+
+    Attributs :
+        sampling_rate (float)  : Fréquence d’échantillonnage (Hz)
+        distance_sec (float)   : Durée minimale entre deux pics (en s)
+        prominence (float)     : Proéminence minimale des pics
+        latency_sec (float)    : Retard fixe avant confirmation d’un pic (en s)
+        lookback_sec (float)   : Historique conservé avant la zone à confirmer (en s)
+        n_samples (int)        : Nombre total d’échantillons reçus
+        num_peaks (int)        : Nombre total de pics confirmés
+    """
+
+    def __init__(self, sampling_rate=200, distance_sec=0.4, prominence=3,
+                 latency_sec=5.0, lookback_sec=20.0):
+        self.sampling_rate = sampling_rate
+        self.distance_sec = distance_sec
+        self.prominence = prominence
+        self.latency = int(latency_sec * sampling_rate)
+        self.lookback = int(lookback_sec * sampling_rate)
+        self.distance_samples = int(distance_sec * sampling_rate)
+        self.reset()
+
+    def reset(self):
+        """
+        Réinitialise l’état (tampon, compteurs, dernier pic).
+        """
+        self._buffer = np.empty(0)
+        self._buffer_start = 0      # Index global du premier échantillon du tampon
+        self._confirmed_upto = 0    # Les pics d’index global < cette borne sont définitifs
+        self.last_peak = None
+        self.n_samples = 0
+        self.num_peaks = 0
+
+    def _find_peaks(self, x):
+        """
+        find_peaks(x, distance, prominence), avec départage explicite des ex æquo : parmi
+        des maxima locaux de même hauteur à moins de distance_sec, le plus ancien est
+        retenu. find_peaks les ordonne par un tri instable sur tous les maxima du tableau,
+        donc selon le contenu du tampon ; ici le choix ne dépend que des deux candidats.
+
+        Returns:
+            np.ndarray : Index des pics dans x
+        """
+        candidates, _ = find_peaks(x)
+        heights = x[candidates]
+        levels = np.unique(heights)
+        ranked = x
+        if len(levels) < len(heights):
+            # Hauteurs relevées de moins d’un demi-écart entre niveaux : l’ordre des hauteurs
+            # distinctes est conservé et, à hauteur égale, le candidat le plus ancien passe devant
+            gap = np.min(np.diff(levels)) if len(levels) > 1 else 1.0
+            ranked = x.copy()
+            ranked[candidates] = heights + 0.5 * gap * (
+                1 - np.arange(len(candidates)) / len(candidates))
+
+        # Même ordre que find_peaks : sélection par distance, puis par proéminence (sur x)
+        peaks, _ = find_peaks(ranked, distance=self.distance_samples)
+        prominences = peak_prominences(x, peaks)[0]
+        return peaks[prominences >= self.prominence]
+
+    def _emit(self, end):
+        """
+        Confirme les pics du tampon dont l’index global est dans [confirmed_upto, end[.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray] : nouveaux R-peaks (index globaux) et intervalles R-R (s)
+        """
+        peaks = self._find_peaks(self._buffer) + self._buffer_start
+        new_peaks = peaks[(peaks >= self._confirmed_upto) & (peaks < end)]
+
+        # Un pic déjà émis ne peut plus être retiré : un nouveau pic à moins de distance_sec
+        # du dernier pic émis est abandonné (écart minimal toujours respecté)
+        if self.last_peak is not None:
+            new_peaks = new_peaks[new_peaks - self.last_peak >= self.distance_samples]
+
+        previous = [] if self.last_peak is None else [self.last_peak]
+        rr_intervals = np.diff(np.concatenate(
+            (previous, new_peaks))) / self.sampling_rate
+
+        if len(new_peaks):
+            self.last_peak = int(new_peaks[-1])
+            self.num_peaks += len(new_peaks)
+        self._confirmed_upto = max(self._confirmed_upto, end)
+        return new_peaks, rr_intervals
+
+    def push(self, chunk):
+        """
+        Ajoute un morceau de signal et renvoie les R-peaks nouvellement confirmés.
+
+        Args:
+            chunk (np.ndarray) : Nouveaux échantillons (taille libre)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray] : nouveaux R-peaks (index globaux) et
+            intervalles R-R correspondants (en s, depuis le pic précédent)
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        self._buffer = np.concatenate((self._buffer, chunk))
+        self.n_samples += len(chunk)
+
+        result = self._emit(self.n_samples - self.latency)
+
+        # Le tampon ne garde que lookback échantillons avant la zone à confirmer
+        keep_from = max(self._buffer_start,
+                        self._confirmed_upto - self.lookback)
+        self._buffer = self._buffer[keep_from - self._buffer_start:]
+        self._buffer_start = keep_from
+        return result
+
+    def flush(self):
+        """
+        Fin de flux : confirme les pics restants (comme la détection sur signal complet).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray] : derniers R-peaks et intervalles R-R
+        """
+        return self._emit(self.n_samples)
+
+
+if __name__ == "__main__":
+    # Benchmark : débit et latence par morceau, comparaison avec la détection globale
+    import time
+    from peak_detector import PeakDetector
+
+    fs = 200
+    rng = np.random.default_rng(0)
+    n_beats = 20_000
+    rr = np.clip(0.8 + 0.05 * rng.standard_normal(n_beats), 0.4, None)
+    beat_pos = np.cumsum(np.round(rr * fs).astype(int))
+    signal = 60 + rng.standard_normal(beat_pos[-1] + fs)
+    for offset, amp in [(-2, 6), (-1, 14), (0, 20), (1, 14), (2, 6)]:
+        signal[beat_pos + offset] += amp
+
+    batch = PeakDetector(signal, np.arange(len(signal)) / fs, fs)
+    ref_peaks, _ = batch.detect_r_peaks_manual(distance_sec=0.4, prominence=3)
+
+    for chunk_size in [20, 200, 2000]:
+        detector = StreamingPeakDetector(fs, distance_sec=0.4, prominence=3)
+        peaks, durations = [], []
+        start = time.perf_counter()
+        for i in range(0, len(signal), chunk_size):
+            t0 = time.perf_counter()
+            new_peaks, _ = detector.push(signal[i:i + chunk_size])
+            durations.append(time.perf_counter() - t0)
+            peaks.append(new_peaks)
+        peaks.append(detector.flush()[0])
+        elapsed = time.perf_counter() - start
+
+        same = np.array_equal(np.concatenate(peaks), ref_peaks)
+        print(f"chunk={chunk_size:>5} : {len(signal) / elapsed / 1e6:.2f} Méch/s, "
+              f"latence/morceau médiane {1e6 * np.median(durations):.0f} µs, "
+              f"max {1e6 * np.max(durations):.0f} µs, identique : {same}")
+
+    # Enregistrements réels : comparaison avec la détection globale du notebook
+    import glob
+    import os
+    from data_loader import DataLoader
+
+    for filepath in sorted(glob.glob("../data/data1/*.txt")):
+        data = DataLoader(filepath, 5).load(engine="c")
+        signal = data["HR"].to_numpy()
+        batch = PeakDetector(signal, data["Time"].to_numpy(), fs)
+        ref_peaks, _ = batch.detect_r_peaks_manual(distance_sec=0.4, prominence=3)
+        results = []
+        for chunk_size in [7, 100, 1000]:
+            detector = StreamingPeakDetector(fs, distance_sec=0.4, prominence=3)
+            peaks = [detector.push(signal[i:i + chunk_size])[0]
+                     for i in range(0, len(signal), chunk_size)]
+            peaks.append(detector.flush()[0])
+            results.append(np.array_equal(np.concatenate(peaks), ref_peaks))
+        print(f"{os.path.basename(filepath):>18} : {len(ref_peaks)} pics, identique "
+              f"(morceaux de 7 / 100 / 1000) : {results}")
@@ -0,0 +1,107 @@
+import numpy as np
+from scipy.signal import butter, lfilter, sosfilt, sosfilt_zi
+
+
+class StreamingTrendExtractor:
+    """
+    Extraction causale d’une tendance lente sur un signal reçu par morceaux successifs.
+
+    Contrairement à TrendExtractor (centré, sur signal complet avec padding miroir), le filtre
+    est causal et son état est conservé d’un morceau à l’autre : la mémoire est constante et
+    le résultat sur un signal découpé est exactement identique à celui sur le signal concaténé.
+
+    Deux méthodes :
+        - "moving_average" : moyenne des window_size derniers échantillons, par somme
+          récursive (O(1) par échantillon) ; retard de (window_size - 1) / 2 échantillons
+        - "lowpass"        : passe-bas de Butterworth (sections du second ordre, état zi)
+
+    Attributs :
+        method (str)          : Méthode de filtrage
+        window_size (int)     : Taille de la moyenne glissante ("moving_average")
+        cutoff_hz (float)     : Fréquence de coupure ("lowpass")
+        order (int)           : Ordre du filtre ("lowpass")
+        sampling_rate (float) : Fréquence d’échantillonnage (Hz)
+        delay_samples (float) : Retard de groupe approximatif de la tendance (en échantillons)
+    """
+
+    def __init__(self, method="moving_average", window_size=1001, cutoff_hz=0.1,
+                 order=2, sampling_rate=200):
+        self.method = method
+        self.window_size = window_size
+        self.cutoff_hz = cutoff_hz
+        self.order = order
+        self.sampling_rate = sampling_rate
+
+        if method == "moving_average":
+            self.delay_samples = (window_size - 1) / 2
+        elif method == "lowpass":
+            self._sos = butter(order, cutoff_hz, btype='low',
+                               fs=sampling_rate, output='sos')
+            # Retard de groupe à fréquence nulle, en échantillons
+            self.delay_samples = self._group_delay_dc()
+        else:
+            raise ValueError(f"Méthode inconnue : {method}")
+
+        self.reset()
+
+    def _group_delay_dc(self):
+        """Retard de groupe du passe-bas à 0 Hz (somme des sections)."""
+        delay = 0.0
+        for b0, b1, b2, _, a1, a2 in self._sos:
+            delay += (b1 + 2 * b2) / (b0 + b1 + b2) - (a1 + 2 * a2) / (1 + a1 + a2)
+        return delay
+
+    def reset(self):
+        """
+        Réinitialise l’état du filtre (le prochain morceau est traité comme un début de signal).
+        """
+        self._history = None   # window_size derniers échantillons ("moving_average")
+        self._zi = None        # État du filtre récursif
+
+    def _start(self, first_value):
+        """Initialise l’état en régime établi sur la première valeur (pas de transitoire depuis 0)."""
+        if self.method == "moving_average":
+            self._history = np.full(self.window_size, first_value)
+            self._zi = np.array([first_value])
+        else:
+            self._zi = sosfilt_zi(self._sos) * first_value
+
+    def push(self, chunk):
+        """
+        Filtre un nouveau morceau et renvoie la tendance correspondante.
+
+        Args:
+            chunk (np.ndarray) : Nouveaux échantillons (taille libre)
+
+        Returns:
+            np.ndarray : Tendance sur ces échantillons (même longueur que chunk)
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if len(chunk) == 0:
+            return chunk
+        if self._zi is None:
+            self._start(chunk[0])
+
+        if self.method == "moving_average":
+            # y[n] = y[n-1] + (x[n] - x[n-w]) / w, récursion d’ordre 1 avec état zi
+            extended = np.concatenate((self._history, chunk))
+            increments = (chunk - extended[:len(chunk)]) / self.window_size
+            trend, self._zi = lfilter([1.0], [1.0, -1.0], increments, zi=self._zi)
+            self._history = extended[-self.window_size:]
+        else:
+            trend, self._zi = sosfilt(self._sos, chunk, zi=self._zi)
+
+        return trend
+
+    def iter_trend(self, chunks):
+        """
+        Applique push à une suite de morceaux.
+
+        Args:
+            chunks (iterable) : Morceaux successifs du signal
+
+        Yields:
+            np.ndarray : Tendance de chaque morceau
+        """
+        for chunk in chunks:
+            yield self.push(chunk)
@@ -1,6 +1,9 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.interpolate import UnivariateSpline
+from scipy.interpolate import UnivariateSpline, LSQUnivariateSpline
+from scipy.signal import fftconvolve
+
+from plot_downsampler import PlotDownsampler
+from figure_renderer import FigureRenderer
 
 
 class TrendExtractor:
@@ -21,30 +24,64 @@ class TrendExtractor:
         self.signal = signal
         self.time = time
         self.trend = None  # Stocke la dernière tendance extraite
+        self.spline_report = None  # Diagnostic de la dernière spline par paquets
 
-    def extract_rolling_mean(self, window_size=1001):
+    def extract_rolling_mean(self, window_size=1001, method="auto", signal=None):
         """
         Calcule la tendance via une moyenne glissante centrée, avec padding aux bords.
 
+        Méthodes de calcul (même résultat, au bruit d’arrondi près) :
+            - "direct" : convolution directe, O(n·w)
+            - "fft"    : convolution par FFT, O(n log n)
+            - "cumsum" : sommes cumulées, O(n) quelle que soit la fenêtre
+            - "auto"   : "direct" pour les petites fenêtres, "cumsum" au-delà
+
         Args:
-            window_size (int): Taille de la fenêtre (impair conseillé)
+            window_size (int)   : Taille de la fenêtre (impair conseillé)
+            method (str)        : "auto", "direct", "fft" ou "cumsum"
+            signal (np.ndarray) : Signal(s) à traiter (par défaut self.signal) ;
+                                  un tableau 2-D est traité ligne par ligne
 
         Returns:
             np.ndarray : signal de tendance
         """
+        values = np.asarray(self.signal if signal is None else signal,
+                            dtype=np.float64)
+
         if window_size % 2 == 0:
             window_size += 1  # S'assurer que la fenêtre est impaire
 
         half_win = window_size // 2
 
         # Extension du signal en miroir pour éviter les effets de bord
-        padded = np.pad(self.signal, (half_win, half_win), mode='reflect')
+        pad_width = [(0, 0)] * (values.ndim - 1) + [(half_win, half_win)]
+        padded = np.pad(values, pad_width, mode='reflect')
 
-        # Convolution centrée (mode='valid' sur le signal étendu)
-        trend = np.convolve(padded, np.ones(
-            window_size) / window_size, mode='valid')
+        if method == "auto":
+            method = "direct" if window_size <= 64 else "cumsum"
+
+        if method == "direct":
+            kernel = np.ones(window_size) / window_size
+            trend = np.apply_along_axis(
+                np.convolve, -1, padded, kernel, mode='valid')
+        elif method == "fft":
+            kernel = np.ones(window_size) / window_size
+            kernel = kernel.reshape((1,) * (values.ndim - 1) + (-1,))
+            trend = fftconvolve(padded, kernel, mode='valid', axes=-1)
+        elif method == "cumsum":
+            # Somme de chaque fenêtre = différence de deux sommes cumulées ; le signal est
+            # centré au préalable pour limiter l’accumulation d’erreurs d’arrondi
+            offset = padded.mean(axis=-1, keepdims=True)
+            cumulative = np.cumsum(padded - offset, axis=-1)
+            zeros = np.zeros(cumulative.shape[:-1] + (1,))
+            cumulative = np.concatenate((zeros, cumulative), axis=-1)
+            trend = offset + (cumulative[..., window_size:]
+                              - cumulative[..., :-window_size]) / window_size
+        else:
+            raise ValueError(f"Méthode de calcul inconnue : {method}")
 
-        self.trend = trend
+        if signal is None:
+            self.trend = trend
         return trend
 
     def extract_spline(self, smooth_factor=1e7):
@@ -61,6 +98,86 @@ class TrendExtractor:
         self.trend = spline(self.time)
         return self.trend
 
+    def extract_spline_binned(self, smooth_factor=1e7, bin_size=10, knot_spacing=None,
+                              compare_exact=False):
+        """
+        Tendance par spline cubique ajustée sur des moyennes par paquets d’échantillons,
+        puis évaluée sur tout l’axe temporel (adapté aux enregistrements de plusieurs heures).
+
+        Le signal est réduit à ses moyennes sur des paquets de bin_size points, pondérées par
+        la racine de l’effectif. La somme des carrés des résidus d’un ajustement complet se
+        décompose en (dispersion interne aux paquets) + (résidus sur les moyennes pondérées) :
+        le critère smooth_factor de extract_spline est donc conservé en retirant la
+        dispersion interne. Avec knot_spacing, les nœuds sont fixés tous les knot_spacing
+        secondes (moindres carrés) : coût et mémoire linéaires, indépendants du lissage.
+        C’est le mode à privilégier sur plusieurs heures : smooth_factor étant une somme
+        absolue de résidus, une valeur réglée sur 250 s rend la spline quasi interpolante
+        (et lente, avec des milliers de nœuds) sur un enregistrement long.
+
+        Le diagnostic est stocké dans self.spline_report (nb de paquets, nœuds, lissage
+        effectif et, si compare_exact, écarts max et RMS à la même spline ajustée sur tous
+        les échantillons : extract_spline sans knot_spacing, sinon spline des moindres
+        carrés sur les mêmes nœuds).
+
+        Args:
+            smooth_factor (float)      : Paramètre de lissage, même sens que dans extract_spline
+            bin_size (int)             : Nombre d’échantillons par paquet
+            knot_spacing (float|None)  : Espacement fixe des nœuds en secondes, supérieur à la
+                                         largeur d’un paquet (None = lissage par s)
+            compare_exact (bool)       : Calcule aussi la spline exacte pour mesurer l’écart (coûteux)
+
+        Returns:
+            np.ndarray : signal de tendance
+        """
+        signal = np.asarray(self.signal, dtype=np.float64)
+        time = np.asarray(self.time, dtype=np.float64)
+
+        # Moyennes par paquets (le dernier paquet peut être incomplet)
+        starts = np.arange(0, len(signal), bin_size)
+        counts = np.diff(np.append(starts, len(signal)))
+        signal_means = np.add.reduceat(signal, starts) / counts
+        time_means = np.add.reduceat(time, starts) / counts
+        weights = np.sqrt(counts)
+        within_ss = np.sum((signal - np.repeat(signal_means, counts)) ** 2)
+
+        if knot_spacing is None:
+            effective_s = max(smooth_factor - within_ss, 0.0)
+            spline = UnivariateSpline(time_means, signal_means, w=weights, s=effective_s)
+        else:
+            # Schoenberg–Whitney : chaque intervalle entre nœuds doit contenir des moyennes
+            bin_width = bin_size * (time[-1] - time[0]) / max(len(time) - 1, 1)
+            if knot_spacing <= bin_width:
+                raise ValueError(
+                    f"knot_spacing ({knot_spacing} s) doit être supérieur à la largeur d’un "
+                    f"paquet ({bin_width:g} s) : augmenter knot_spacing ou réduire bin_size")
+            effective_s = None
+            # Nœuds placés entre deux moyennes (au moins une moyenne par intervalle) et à
+            # plus de 4 paquets des bords, pour satisfaire la condition aux extrémités
+            candidates = np.arange(time_means[0] + knot_spacing, time_means[-1], knot_spacing)
+            positions = np.unique(np.searchsorted(time_means, candidates))
+            positions = positions[(positions > 4) & (positions < len(time_means) - 4)]
+            knots = (time_means[positions - 1] + time_means[positions]) / 2
+            spline = LSQUnivariateSpline(time_means, signal_means, knots, w=weights)
+
+        self.trend = spline(time)
+        self.spline_report = {
+            "n_bins": len(starts),
+            "n_knots": len(spline.get_knots()),
+            "within_bin_ss": within_ss,
+            "effective_smooth_factor": effective_s,
+        }
+
+        if compare_exact:
+            if knot_spacing is None:
+                exact = UnivariateSpline(time, signal, s=smooth_factor)(time)
+            else:
+                exact = LSQUnivariateSpline(time, signal, knots)(time)
+            difference = self.trend - exact
+            self.spline_report["max_abs_diff"] = np.max(np.abs(difference))
+            self.spline_report["rms_diff"] = np.sqrt(np.mean(difference ** 2))
+
+        return self.trend
+
     def extract_combined(self, rolling_window=1001, smooth_factor=1e7):
         """
         Calcule une tendance combinée (moyenne glissante + spline).
@@ -79,7 +196,8 @@ class TrendExtractor:
         self.trend = combined
         return combined
 
-    def plot_trend(self, label="Tendance", show=True, save_path=None):
+    def plot_trend(self, label="Tendance", show=True, save_path=None, downsample=True,
+                   headless=False):
         """
         Affiche le signal original et la tendance extraite.
 
@@ -87,22 +205,68 @@ class TrendExtractor:
             label (str)         : Légende pour la tendance
             show (bool)         : Afficher la figure
             save_path (str|None): Chemin pour enregistrer l’image
+            downsample (bool)   : Réduire les séries à la résolution de la figure
+            headless (bool)     : Figure Agg hors pyplot, renvoyée sans affichage (FigureRenderer)
+
+        Returns:
+            Figure : Figure créée
         """
-        plt.figure(figsize=(14, 4))
-        plt.plot(self.time, self.signal, label="Signal original", alpha=0.5)
+        fig, ax = FigureRenderer.new_figure((14, 4), headless)
+        reducer = PlotDownsampler(fig, enabled=downsample)
+        ax.plot(*reducer.reduce(self.time, self.signal), label="Signal original", alpha=0.5)
 
         if self.trend is not None:
-            plt.plot(self.time, self.trend, label=label, color='red')
-
-        plt.title("Extraction de la tendance")
-        plt.xlabel("Temps (s)")
-        plt.ylabel("Amplitude")
-        plt.grid(True)
-        plt.legend()
-
-        if save_path:
-            plt.savefig(save_path)
-        if show:
-            plt.show()
-        else:
-            plt.close()
+            ax.plot(*reducer.reduce(self.time, self.trend), label=label, color='red')
+
+        ax.set_title("Extraction de la tendance")
+        ax.set_xlabel("Temps (s)")
+        ax.set_ylabel("Amplitude")
+        ax.grid(True)
+        ax.legend()
+        return FigureRenderer.finish(fig, save_path, show, headless)
+
+
+if __name__ == "__main__":
+    # Benchmark : moyenne glissante selon la taille de fenêtre et la méthode
+    import time
+
+    rng = np.random.default_rng(0)
+    n = 2_000_000
+    x = np.cumsum(rng.standard_normal(n)) + 60
+    extractor = TrendExtractor(x, np.arange(n) / 200)
+
+    for window in [101, 1001, 10_001, 100_001]:
+        timings = {}
+        results = {}
+        for method in ["direct", "fft", "cumsum"]:
+            if method == "direct" and window > 10_001:
+                continue  # Trop long en O(n·w)
+            start = time.perf_counter()
+            results[method] = extractor.extract_rolling_mean(window, method=method)
+            timings[method] = time.perf_counter() - start
+        error = max(np.max(np.abs(r - results["fft"])) for r in results.values())
+        print(f"window={window:>7} : " + ", ".join(
+            f"{m} {t:.3f} s" for m, t in timings.items()) + f" (écart max {error:.1e})")
+
+    x2 = np.vstack([x] * 8)
+    start = time.perf_counter()
+    extractor.extract_rolling_mean(10_001, signal=x2)
+    print(f"2-D (8 x {n}) window=10001 : {time.perf_counter() - start:.3f} s")
+
+    # Spline par paquets sur un enregistrement de plusieurs heures
+    hours = 4
+    n = int(hours * 3600 * 200)
+    t = np.arange(n) / 200
+    x = 60 + 5 * np.sin(2 * np.pi * t / 600) + 10 * np.sin(2 * np.pi * 1.2 * t) \
+        + rng.standard_normal(n)
+    extractor = TrendExtractor(x, t)
+    start = time.perf_counter()
+    extractor.extract_spline_binned(bin_size=200, knot_spacing=5.0)
+    print(f"Spline par paquets ({hours} h, nœuds tous les 5 s) : "
+          f"{time.perf_counter() - start:.2f} s, {extractor.spline_report['n_knots']} nœuds")
+
+    crop = slice(0, 250 * 200)
+    extractor = TrendExtractor(x[crop], t[crop])
+    extractor.extract_spline_binned(bin_size=10, compare_exact=True)
+    print(f"Écart à la spline exacte (250 s) : max {extractor.spline_report['max_abs_diff']:.3g}, "
+          f"RMS {extractor.spline_report['rms_diff']:.3g}")